@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+bench_memory.py — peak RSS of the works-table pipeline, default vs compact dtypes.
+
+Generates a synthetic authorship CSV shaped like openalex_all_authors_*_key_fields.csv (default
+100k works, ~1.4 roster authors per work, realistic cardinalities for type/OA status/venue/topic),
+then runs each mode in a fresh subprocess and reports peak RSS and DataFrame memory:
+
+- default   pd.read_csv as the ETL did before (object or str columns depending on the pandas version)
+- object    the same with every text column forced to Python objects (pandas < 3 behaviour)
+- compact   vetmic_etl.frames.read_compact_csv (categoricals, nullable ints, python-backed strings)
+- compact+arrow   the same with ETL_STRING_STORAGE=pyarrow (only with --with-pyarrow)
+
+Each of these reads the table, deduplicates on (id, doi) and cuts a last-5-years view. With
+--with-stage, two more modes run the real post-harvest stage (works_store.materialize_views + the
+co-author graph, 50 layout iterations) on the same CSV as the store:
+
+- stage-reread   each step parses the store CSV itself (as the harvest did before)
+- stage-shared   the store is parsed once and handed to both steps (works.finish_harvest)
+
+By default the children run with pyarrow hidden, which is the CI configuration (the workflow does
+not install it); pandas 3 then backs its default str dtype with Python objects. --with-pyarrow
+measures with pyarrow importable instead, where the "default" mode gets Arrow-backed strings.
+
+Usage:
+    python benchmarks/bench_memory.py [--works 100000] [--seed 7] [--keep PATH] [--with-pyarrow] [--with-stage]
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ETL_DIR = os.path.join(HERE, os.pardir, "etl")
+
+COLUMNS = [
+    "id", "doi", "display_name", "publication_year", "type", "cited_by_count",
+    "open_access__oa_status", "host_venue__display_name", "primary_location__source__display_name",
+    "primary_topic__display_name", "primary_topic__field__display_name", "primary_topic__subfield__display_name",
+    "biblio__volume", "biblio__issue", "biblio__first_page", "biblio__last_page", "fwci",
+    "authors", "institutions", "concepts_list", "author_name", "author_openalex_id",
+]
+TYPES = ["article", "review", "book-chapter", "preprint", "dataset", "letter", "editorial", "erratum", "other"]
+OA = ["closed", "gold", "green", "hybrid", "bronze", "diamond"]
+
+
+def generate(path: str, n_works: int, seed: int) -> int:
+    rng = random.Random(seed)
+    venues = [f"Journal of Veterinary Topic {i}" for i in range(5000)]
+    topics = [f"Research topic number {i} in microbiology" for i in range(4500)]
+    fields = [f"Field {i}" for i in range(26)]
+    subfields = [f"Subfield {i}" for i in range(250)]
+    roster = [f"https://openalex.org/A{5000000000 + i}" for i in range(2000)]
+    surnames = [f"Surname{i}" for i in range(20000)]
+    insts = [f"University of Place {i}" for i in range(3000)]
+    concepts = [f"Concept {i}" for i in range(8000)]
+
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUMNS)
+        for i in range(n_works):
+            topic = rng.randrange(len(topics))
+            venue = rng.choice(venues)
+            authors = "; ".join(f"{rng.choice('ABCDEFGHJKLMNPRSTW')}. {rng.choice(surnames)}" for _ in range(rng.randint(2, 12)))
+            base = [
+                f"https://openalex.org/W{4000000000 + i}",
+                f"https://doi.org/10.{1000 + i % 9000}/synthetic.{i}" if rng.random() > 0.05 else "",
+                f"Synthetic study {i} of host-pathogen interactions in livestock",
+                rng.randint(1990, 2025),
+                rng.choices(TYPES, weights=[70, 10, 5, 5, 2, 2, 2, 1, 3])[0],
+                int(rng.expovariate(1 / 25)),
+                rng.choice(OA),
+                venue,
+                venue,
+                topics[topic],
+                fields[topic % len(fields)],
+                subfields[topic % len(subfields)],
+                str(rng.randint(1, 300)),
+                str(rng.randint(1, 12)),
+                str(rng.randint(1, 900)),
+                str(rng.randint(901, 1800)),
+                f"{rng.random() * 5:.3f}" if rng.random() > 0.3 else "",
+                authors,
+                "; ".join(rng.sample(insts, rng.randint(1, 4))),
+                "; ".join(rng.sample(concepts, rng.randint(3, 10))),
+            ]
+            # Co-authored works appear once per roster author (pre-dedup authorship rows)
+            for aid in rng.sample(roster, 1 if rng.random() < 0.7 else rng.randint(2, 3)):
+                w.writerow(base + [aid.rsplit("/", 1)[-1], aid])
+                rows += 1
+    return rows
+
+
+def run_stage(mode: str, path: str) -> "pd.DataFrame":
+    """Views + co-author graph on `path` as the store, parsing it per step or once."""
+    from vetmic_etl import coauthor_graph, frames, works_store
+
+    out_dir = tempfile.mkdtemp(prefix="bench_stage_")
+    views = works_store.parse_views(works_store.DEFAULT_VIEWS)
+    store = frames.read_compact_csv(path) if mode == "stage-shared" else None
+    summary = works_store.materialize_views(path, out_dir, views, store=store)
+    coauthor_graph.build_coauthor_graph(path, {}, summary, os.path.join(out_dir, coauthor_graph.GRAPH_FILENAME), store)
+    for name in os.listdir(out_dir):
+        os.remove(os.path.join(out_dir, name))
+    os.rmdir(out_dir)
+    return store if store is not None else frames.read_compact_csv(path)
+
+
+def run_mode(mode: str, path: str) -> None:
+    """Child process: load + dedup + last5y view (or the stage), print one JSON line of measurements."""
+    if os.getenv("BENCH_PYARROW") != "1":
+        sys.modules["pyarrow"] = None  # CI configuration: import pyarrow raises ImportError
+    sys.path.insert(0, ETL_DIR)
+    import pandas as pd
+    from vetmic_etl import frames
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if mode.startswith("stage-"):
+        df = run_stage(mode, path)
+    elif mode == "compact":
+        df = frames.read_compact_csv(path)
+    elif mode == "object":
+        df = pd.read_csv(path, dtype={c: object for c in COLUMNS if c not in ("publication_year", "cited_by_count", "fwci")})
+    else:
+        df = pd.read_csv(path)
+    dedup = df.drop_duplicates(subset=["id", "doi"], keep="first")
+    years = pd.to_numeric(df["publication_year"], errors="coerce")
+    last5 = df[(years >= 2021).fillna(False)]
+    print(json.dumps({
+        "mode": mode,
+        "rows": len(df),
+        "works": len(dedup),
+        "last5y_rows": len(last5),
+        "frame_mb": round(df.memory_usage(deep=True).sum() / 2**20, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # Linux: KiB
+        "delta_rss_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+        "pandas": pd.__version__,
+        "string_storage": frames.STRING_STORAGE,
+        "default_str": getattr(pd.read_csv(io.StringIO("a\nx\n"))["a"].dtype, "storage", "object"),
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Peak RSS benchmark: default vs compact works-table dtypes")
+    parser.add_argument("--works", type=int, default=100_000, help="Number of synthetic works (default 100000)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", default=None, help="Write the synthetic CSV here instead of a temp file")
+    parser.add_argument("--with-pyarrow", action="store_true",
+                        help="Let the children import pyarrow (default: hidden, as in CI); adds compact+arrow")
+    parser.add_argument("--with-stage", action="store_true",
+                        help="Also run the views + co-author graph stage (stage-reread, stage-shared)")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "CSV"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(*args.child)
+        return
+
+    path = args.keep or os.path.join(tempfile.mkdtemp(prefix="bench_memory_"), "works.csv")
+    rows = generate(path, args.works, args.seed)
+    print(f"synthetic table: {args.works} works, {rows} authorship rows, {os.path.getsize(path) / 2**20:.1f} MB CSV")
+
+    modes = [("default", None), ("object", None), ("compact", "python")]
+    if args.with_pyarrow:
+        modes.append(("compact", "pyarrow"))
+    if args.with_stage:
+        modes += [("stage-reread", "python"), ("stage-shared", "python")]
+
+    results = []
+    for mode, storage in modes:
+        env = dict(os.environ, ETL_GRAPH_LAYOUT_ITERATIONS="50")
+        env["BENCH_PYARROW"] = "1" if args.with_pyarrow else "0"
+        if storage:
+            env["ETL_STRING_STORAGE"] = storage
+        out = subprocess.run([sys.executable, __file__, "--child", mode, path], check=True, capture_output=True, text=True, env=env)
+        rec = json.loads(out.stdout.strip().splitlines()[-1])
+        if rec["string_storage"] == "pyarrow" and mode == "compact":
+            rec["mode"] = "compact+arrow"
+        elif storage == "pyarrow":
+            continue  # pyarrow not installed; same as plain compact
+        results.append(rec)
+
+    print(f"{'mode':<14} {'frame MB':>9} {'peak RSS MB':>12} {'RSS growth MB':>14}")
+    for r in results:
+        print(f"{r['mode']:<14} {r['frame_mb']:>9} {r['peak_rss_mb']:>12} {r['delta_rss_mb']:>14}")
+    print(f"(pandas {results[0]['pandas']}, default str storage: {results[0]['default_str']}; "
+          f"all modes: {results[0]['works']} unique works, {results[0]['last5y_rows']} last-5y rows)")
+
+    if not args.keep:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,42 @@
 // dashboard.js — full version with OpenAlex profile links and FWCI in publications
 (function(){
-  // ==== Defaults ====
-  const DEFAULT_START_YEAR = 2021;
-  const DEFAULT_END_YEAR = 2025;
+  // ==== Defaults (replaced by the primary view in data/works_views.json when the ETL wrote one) ====
+  let DEFAULT_START_YEAR = 2021;
+  let DEFAULT_END_YEAR = 2025;
 
   document.addEventListener('DOMContentLoaded', () => {
     // Paths used by index.html
     const rosterPath = 'data/roster_with_metrics.csv';
     const pubsPath = 'data/openalex_all_authors_last5y_key_fields_dedup.csv';
     const authorshipsPath = 'data/openalex_all_authors_last5y_key_fields.csv'; // pre-dedup, optional
+    const viewsManifestPath = 'data/works_views.json'; // reporting windows written by the ETL, optional
+    const coauthorGraphPath = 'data/coauthor_graph.json'; // precomputed network layout + metrics, optional
+    const bundleDir = 'data/bundle/'; // content-hashed, pre-compressed copies of the above, optional
+    const bundleManifestPath = bundleDir + 'manifest.json';
     
     // In-memory data
     let rosterData = [];   // faculty roster + metrics
     let pubData = [];      // publications (last 5y)
     let yearBounds = { min: DEFAULT_START_YEAR, max: DEFAULT_END_YEAR };
     let authorshipData = null;
+    let coauthorArtifact = null; // { names, buckets: { view: { start_year, end_year, nodes, edges } } }
 
     // Focus (single author) state
     let focusedAuthorID = null;
     let focusedAuthorName = '';
     let lastSelectedPubs = []; // holds the most recent filtered publications
 
-    // Load both CSVs, then initialize
-    Promise.all([
-      fetchCSV(rosterPath),
-      fetchCSV(pubsPath),
-      fetchCSVIfExists(authorshipsPath)])
-      .then(([rosterCSV, pubsCSV, authCSV]) => {
+    // Load the data (via the ETL's hashed bundle when it has one), then initialize
+    fetchBundleManifest()
+      .then(bundle => Promise.all([
+        fetchArtifact(bundle, 'roster', () => fetchCSV(rosterPath)),
+        fetchArtifact(bundle, 'pubs', () => fetchCSV(pubsPath)),
+        fetchArtifact(bundle, 'authorships', () => fetchCSVIfExists(authorshipsPath)),
+        fetchArtifact(bundle, 'views', () => fetchJSONIfExists(viewsManifestPath), JSON.parse),
+        fetchArtifact(bundle, 'coauthor_graph', () => fetchJSONIfExists(coauthorGraphPath), JSON.parse)]))
+      .then(([rosterCSV, pubsCSV, authCSV, viewsManifest, graphJSON]) => {
+      applyViewsManifest(viewsManifest); // before normalizePubs(), which clamps years to the defaults
+      coauthorArtifact = (graphJSON && graphJSON.buckets) ? graphJSON : null;
       rosterData = parseCSV(rosterCSV);
       pubData = parseCSV(pubsCSV);
       authorshipData = authCSV ? parseCSV(authCSV) : [];
@@ -49,6 +59,54 @@
     function fetchCSVIfExists(path){
       return fetch(path).then(r => r.ok ? r.text() : null).catch(() => null);
       }
+    function fetchJSONIfExists(path){
+      return fetch(path).then(r => r.ok ? r.json() : null).catch(() => null);
+    }
+
+    // ============ Data bundle (data/bundle/manifest.json, see etl/vetmic_etl/bundle.py) ============
+    // The manifest is tiny and always revalidated; the files it names never change content, so they
+    // may come straight from the browser cache. Only artifacts whose hash changed are downloaded.
+    function fetchBundleManifest(){
+      return fetch(bundleManifestPath, { cache: 'no-cache' })
+        .then(r => r.ok ? r.json() : null)
+        .then(m => (m && m.artifacts) ? m : null)
+        .catch(() => null);
+    }
+    // Hashed .gz (inflated here) -> hashed plain file -> fallback() on the original path
+    function fetchArtifact(bundle, name, fallback, parse){
+      const entry = bundle && bundle.artifacts[name];
+      if (!entry || !entry.file) return fallback();
+      const hashedPlain = () => fetch(bundleDir + entry.file, { cache: 'force-cache' })
+        .then(r => r.ok ? r.text() : Promise.reject(new Error(`${entry.file}: HTTP ${r.status}`)));
+      const gz = entry.encodings && entry.encodings.gzip;
+      const text = (gz && typeof DecompressionStream === 'function')
+        ? fetch(bundleDir + gz.file, { cache: 'force-cache' })
+            .then(r => r.ok ? r.arrayBuffer() : Promise.reject(new Error(`${gz.file}: HTTP ${r.status}`)))
+            .then(gunzipText)
+            .catch(hashedPlain)
+        : hashedPlain();
+      return text
+        .then(t => parse ? parse(t) : t)
+        .catch(err => { console.warn(`Bundle artifact ${name} unavailable, using ${entry.source}`, err); return fallback(); });
+    }
+    function gunzipText(buf){
+      const bytes = new Uint8Array(buf);
+      // A host that sends .gz with Content-Encoding: gzip has already inflated it
+      if (bytes[0] !== 0x1f || bytes[1] !== 0x8b) return new TextDecoder().decode(bytes);
+      return new Response(new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'))).text();
+    }
+
+    // Default year range = the ETL's primary view (last5y), so it rolls over with the data
+    function applyViewsManifest(manifest){
+      const view = manifest && manifest.views && manifest.views[manifest.primary];
+      if (!view) return;
+      const start = toInt(view.start_year), end = toInt(view.end_year);
+      if (start && end && start <= end) {
+        DEFAULT_START_YEAR = start;
+        DEFAULT_END_YEAR = end;
+        yearBounds = { min: start, max: end };
+      }
+    }
     
     function toInt(x) {
       const n = Number(x);
@@ -659,7 +717,15 @@ function setExportButtonCount(n) {
 
 // Main updater
 function updateCoauthorPanels(contributingRoster, selectedPubs){
-  const graph = computeCoauthorGraph(contributingRoster, selectedPubs);
+  // Precomputed by the ETL (etl/vetmic_etl/coauthor_graph.py): exact pair counts for a bucket's full
+  // year range, plus a stable force-directed layout and graph metrics for any selection.
+  const exact = findGraphBucket(yearBounds.min, yearBounds.max, true);
+  const topicEl = document.getElementById('topic-search');
+  const topicActive = !!(topicEl && topicEl.value.trim());
+  const graph = (exact && !topicActive)
+    ? graphFromBucket(exact, contributingRoster)
+    : computeCoauthorGraph(contributingRoster, selectedPubs);
+  applyBucketLayout(graph, exact || findGraphBucket(yearBounds.min, yearBounds.max, false));
   drawCoauthorNetwork(graph);
   drawCoauthorPairsTable(graph);
   const meta = document.getElementById('network-meta');
@@ -668,6 +734,72 @@ function updateCoauthorPanels(contributingRoster, selectedPubs){
   }
 }
 
+// Bucket whose year range equals [min, max] (exact) or, failing that, the narrowest one covering it
+function findGraphBucket(min, max, exact){
+  if (!coauthorArtifact) return null;
+  const buckets = Object.values(coauthorArtifact.buckets || {});
+  if (exact) return buckets.find(b => toInt(b.start_year) === min && toInt(b.end_year) === max) || null;
+  const covering = buckets
+    .filter(b => toInt(b.start_year) <= min && toInt(b.end_year) >= max)
+    .sort((a, b) => (a.end_year - a.start_year) - (b.end_year - b.start_year));
+  return covering[0] || coauthorArtifact.buckets.lifetime || buckets[0] || null;
+}
+
+// Graph straight from the artifact, limited to the contributing roster; joint pubs resolved on click
+// (from all pubs in the bucket's years, matching how the ETL counted the pairs)
+function graphFromBucket(bucket, contributingRoster){
+  const inYears = p => p.publication_year >= toInt(bucket.start_year) && p.publication_year <= toInt(bucket.end_year);
+  const allowed = new Map(contributingRoster.map(r => [normalizeID(r.OpenAlexID), r.Name || r.OpenAlexID]));
+  const edgesRaw = (bucket.edges || []).filter(([a, b]) => allowed.has(a) && allowed.has(b));
+  const inGraph = new Set();
+  edgesRaw.forEach(([a, b]) => { inGraph.add(a); inGraph.add(b); });
+
+  const nodes = (bucket.nodes || [])
+    .filter(n => inGraph.has(n.id))
+    .map(n => ({ id: n.id, name: allowed.get(n.id) || n.id, deg: 0 }));
+  const idxOf = new Map(nodes.map((n, i) => [n.id, i]));
+  let bucketPubs = null;  // pubs in the bucket's years, filtered once on the first click
+  const edges = edgesRaw.map(([a, b, count]) => {
+    const e = { a, b, ai: idxOf.get(a), bi: idxOf.get(b), count, _pubs: null };
+    Object.defineProperty(e, 'pubs', {
+      get(){ return this._pubs || (this._pubs = jointPubs(a, b, bucketPubs || (bucketPubs = pubData.filter(inYears)))); }
+    });
+    return e;
+  });
+  edges.forEach(e => { nodes[e.ai].deg += e.count; nodes[e.bi].deg += e.count; });
+  return { nodes, edges };
+}
+
+// Works in `pubs` that both authors appear on (from the pre-dedup authorship rows)
+function jointPubs(aID, bID, pubs){
+  const wid = s => String(s || '').trim().replace(/^https?:\/\/openalex\.org\/works\//i, '').replace(/^https?:\/\/openalex\.org\//i, '');
+  const aWorks = new Set(), bWorks = new Set();
+  for (const row of (authorshipData || [])) {
+    const aid = normalizeID(row.author_openalex_id);
+    if (aid === aID) aWorks.add(wid(row.id || row.work_id));
+    else if (aid === bID) bWorks.add(wid(row.id || row.work_id));
+  }
+  const seen = new Set();
+  return pubs.filter(p => {
+    const w = wid(p.id || p.work_id);
+    if (!w || seen.has(w) || !aWorks.has(w) || !bWorks.has(w)) return false;
+    seen.add(w);
+    return true;
+  });
+}
+
+// Stable positions + metrics from the artifact; nodes it doesn't know keep the circular fallback
+function applyBucketLayout(graph, bucket){
+  if (!bucket) return;
+  const byId = new Map((bucket.nodes || []).map(n => [n.id, n]));
+  graph.nodes.forEach(n => {
+    const p = byId.get(n.id);
+    if (!p) return;
+    n.x = p.x; n.y = p.y;
+    n.metrics = { degree: p.degree, weighted_degree: p.weighted_degree, betweenness: p.betweenness };
+  });
+}
+
 // REPLACE your existing computeCoauthorGraph with this version
 function computeCoauthorGraph(contributingRoster, selectedPubs){
   const idNorm = s => String(s||'').trim()
@@ -853,7 +985,10 @@ function drawCoauthorNetwork(graph){
       })
       .sort((A, B) => (B.count - A.count) || A.name.localeCompare(B.name))
       .map(p => `• ${escapeHTML(p.name)} (${p.count})`);
-    return `<b>${escapeHTML(n.name)}</b><br>${partners.join('<br>') || 'No in-cohort co-authors in selection'}`;
+    const m = n.metrics
+      ? `<br><span style="color:#64748b">Betweenness ${Number(n.metrics.betweenness).toFixed(3)} · ${n.metrics.degree} co-authors (${bucketLabel()})</span>`
+      : '';
+    return `<b>${escapeHTML(n.name)}</b>${m}<br>${partners.join('<br>') || 'No in-cohort co-authors in selection'}`;
   });
 
   // Nodes: force tooltip to use our rich hoverText
@@ -908,6 +1043,11 @@ function drawCoauthorNetwork(graph){
 }
 
 
+function bucketLabel(){
+  const b = findGraphBucket(yearBounds.min, yearBounds.max, false);
+  return b ? `${b.start_year}–${b.end_year}` : '';
+}
+
 function drawCoauthorPairsTable(graph){
   const body = document.querySelector('#coauthor-table tbody');
   if (!body) return;
@@ -915,7 +1055,7 @@ function drawCoauthorPairsTable(graph){
 
   // Sort pairs by count desc, then alpha
   const rows = graph.edges
-    .map(e => ({ a: graph.nodes[e.ai].name, b: graph.nodes[e.bi].name, key: `${e.a}|${e.b}`, count: e.count, pubs: e.pubs }))
+    .map(e => ({ a: graph.nodes[e.ai].name, b: graph.nodes[e.bi].name, count: e.count, edge: e }))
     .sort((r1, r2) => (r2.count - r1.count) || (r1.a.localeCompare(r2.a)) || (r1.b.localeCompare(r2.b)));
 
   const frag = document.createDocumentFragment();
@@ -923,7 +1063,7 @@ function drawCoauthorPairsTable(graph){
     const tr = document.createElement('tr');
     tr.innerHTML = `<td>${escapeHTML(r.a)}</td><td>${escapeHTML(r.b)}</td><td>${r.count}</td>`;
     tr.addEventListener('click', () => {
-      showPairPublications(r.key.split('|')[0], r.key.split('|')[1], r.pubs);
+      showPairPublications(r.edge.a, r.edge.b, r.edge.pubs);  // joint pubs resolved only here
       // Optional: scroll into view
       document.getElementById('pair-detail')?.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
     });
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+run_etl.py — nightly ETL in one process: author metrics + works harvest, run concurrently.
+
+Replaces running fetch_author_metrics.py and then WCVM_VetMic_works.py (both still work on their
+own). Every stage shares one OpenAlex client (keep-alive session, rate limiter, author cache), and
+each author's works crawl starts as soon as that author's lookup returns; see
+vetmic_etl/orchestrator.py for the stage graph. The run ends by publishing the pre-compressed,
+content-hashed dashboard bundle in <output dir>/bundle (vetmic_etl/bundle.py), also when it fails
+after rewriting outputs, so the bundle always matches the plain files.
+
+Usage (as in the workflow):
+    python etl/run_etl.py \
+        --input data/full_time_faculty.csv \
+        --metrics-output data/roster_with_metrics.csv \
+        --output data/openalex_all_authors_last5y_key_fields_dedup.csv \
+        --email you@ucalgary.ca --log-diffs
+
+Exit codes: 0 ok, 1 failure (incl. no author with last-5y works), 2 no OpenAlex ID/ORCID column.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+from vetmic_etl import works_store
+from vetmic_etl.runlog import setup_run_logging
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="WCVM VetMic nightly ETL (metrics + works, concurrent)")
+    parser.add_argument("--input", "-i", required=True, help="Path to input faculty roster (CSV/TSV/Excel)")
+    parser.add_argument("--metrics-output", "-m", required=True, help="Path to roster-with-metrics output CSV")
+    parser.add_argument("--output", "-o", required=True, help="Path to deduplicated last-5-years output CSV")
+    parser.add_argument("--email", type=str, default=None, help="Contact email for User-Agent and mailto, e.g., name@ucalgary.ca")
+    parser.add_argument("--log-diffs", action="store_true", help="Log per-author metric deltas vs the previous run")
+    parser.add_argument("--history-db", default=None, help="Metrics history (SQLite) (default: <metrics output dir>/metrics_history.sqlite)")
+    parser.add_argument("--history-json", default=None, help="Metrics history export (default: <metrics output dir>/metrics_history.json)")
+    parser.add_argument("--no-history", action="store_true", help="Do not record this run in the metrics history store")
+    parser.add_argument("--views", default=works_store.DEFAULT_VIEWS,
+                        help=f"Comma-separated reporting windows cut from the works store (default: {works_store.DEFAULT_VIEWS})")
+    parser.add_argument("--works-db", default=None,
+                        help="Indexed SQLite works database (default: <output dir>/openalex_works.sqlite)")
+    parser.add_argument("--no-works-db", action="store_true", help="Skip maintaining the works database")
+    parser.add_argument("--no-bundle", action="store_true", help="Do not refresh the dashboard data bundle (<output dir>/bundle)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Concurrent works crawls (default: $ETL_WORKERS or 4); requests are rate limited by $OPENALEX_MAX_RPS")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    log_dir = os.path.join(os.path.dirname(args.output) or "data", "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    setup_run_logging("etl_run", log_dir)
+
+    from vetmic_etl.metrics import MissingIdColumnError
+    from vetmic_etl.orchestrator import WORKERS, run_etl
+    from vetmic_etl.works import HarvestError
+
+    try:
+        run_etl(
+            args.input, args.metrics_output, args.output,
+            email=args.email,
+            log_diffs=args.log_diffs,
+            history_db=args.history_db,
+            history_json=args.history_json,
+            record_history=not args.no_history,
+            views=args.views,
+            works_db_path=False if args.no_works_db else (args.works_db or True),
+            workers=args.workers or WORKERS,
+            publish=not args.no_bundle,
+        )
+    except MissingIdColumnError as e:
+        logging.error(str(e))
+        return 2
+    except HarvestError as e:
+        logging.error(str(e))
+        return 1
+    except Exception as e:
+        logging.exception(f"Fatal error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+vetmic_etl — the WCVM VetMic OpenAlex ETL as an importable package.
+
+The CLI scripts (fetch_author_metrics.py, WCVM_VetMic_works.py, run_etl.py) are thin entry points
+over this package; they are run as `python etl/<script>.py`, which puts etl/ on sys.path, so they
+import it directly without any install step. Other code can do the same (or add etl/ to sys.path):
+
+    from vetmic_etl import fetch_metrics, harvest
+    fetch_metrics("data/roster.csv", "data/roster_with_metrics.csv")
+    harvest("data/roster_with_metrics.csv", "data/openalex_all_authors_last5y_key_fields_dedup.csv")
+
+run_etl() (etl/run_etl.py) runs both concurrently over one shared OpenAlexClient.
+
+Importing the package is cheap: the API below is resolved from its submodule on first access, and
+that submodule imports pandas/numpy/requests normally, so they are fully loaded (on the calling
+thread) before any function that may run in worker threads is handed out.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import Any, List
+
+_API = {
+    # works harvest (vetmic_etl.works)
+    "harvest": "works",
+    "HarvestError": "works",
+    "read_roster": "works",
+    "roster_authors": "works",
+    "fetch_author_works": "works",
+    # author metrics (vetmic_etl.metrics)
+    "fetch_metrics": "metrics",
+    "resolve_author_ids": "metrics",
+    "MissingIdColumnError": "metrics",
+    # one-process metrics + works pipeline (vetmic_etl.orchestrator, vetmic_etl.openalex)
+    "run_etl": "orchestrator",
+    "OpenAlexClient": "openalex",
+    # works store / views (vetmic_etl.works_store)
+    "deduplicate": "works_store",
+    "materialize_views": "works_store",
+    # dashboard data bundle (vetmic_etl.bundle)
+    "build_bundle": "bundle",
+}
+
+__all__ = sorted(_API)
+
+
+def __getattr__(name: str) -> Any:
+    module = _API.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value  # cache: later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,169 @@
+"""
+Pre-compressed, content-hashed data bundle for the dashboard.
+
+Static hosting serves the ETL's CSV/JSON outputs under fixed names with short cache lifetimes and
+no compression control, so every page load re-downloads ~1.7 MB. The bundle publishes each artifact
+under a name that changes only when its content does, so browsers can cache it indefinitely:
+
+    data/bundle/manifest.json                               tiny; fetched first with cache: 'no-cache'
+    data/bundle/<stem>.<hash><ext>                          exact bytes of the source file
+    data/bundle/<stem>.<hash><ext>.gz                       gzip -9 (mtime 0, so reruns are byte-identical)
+
+<hash> is the first 16 hex digits of the SHA-256 of the uncompressed content. GitHub Pages does not
+negotiate Content-Encoding for precompressed files, so the dashboard fetches the .gz itself and
+inflates it with DecompressionStream, falling back to the plain hashed file and then to the
+original path. Only encodings the dashboard reads are written; every one is committed nightly.
+
+manifest.json
+    {"version": 1, "generated": ...,
+     "artifacts": {name: {"source": "roster_with_metrics.csv", "hash", "bytes", "file",
+                          "encodings": {"gzip": {"file", "bytes"}}}}}
+
+Unchanged artifacts are not rewritten. Files referenced by neither the new nor the previous
+manifest are pruned, so a page that loaded yesterday's manifest can still fetch its files.
+The bundle mirrors the plain files on disk: every CLI that rewrites an artifact republishes it,
+also when the run fails after writing, since the dashboard prefers the manifest.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+BUNDLE_DIRNAME = "bundle"
+MANIFEST_FILENAME = "manifest.json"
+HASH_LENGTH = 16
+ENCODINGS = {".gz": "gzip"}
+
+# Logical name -> file in the data directory. Missing files are left out of the manifest.
+ARTIFACTS = {
+    "roster": "roster_with_metrics.csv",
+    "pubs": "openalex_all_authors_last5y_key_fields_dedup.csv",
+    "authorships": "openalex_all_authors_last5y_key_fields.csv",
+    "views": "works_views.json",
+    "coauthor_graph": "coauthor_graph.json",
+    "metrics_history": "metrics_history.json",
+}
+
+
+def hashed_name(source: str, digest: str) -> str:
+    """'roster_with_metrics.csv' + digest -> 'roster_with_metrics.<digest>.csv'."""
+    stem, ext = os.path.splitext(os.path.basename(source))
+    return f"{stem}.{digest}{ext}"
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _manifest_files(manifest: Optional[Dict[str, Any]]) -> Set[str]:
+    files: Set[str] = set()
+    for entry in ((manifest or {}).get("artifacts") or {}).values():
+        files.add(entry.get("file"))
+        files.update(enc.get("file") for enc in (entry.get("encodings") or {}).values())
+    files.discard(None)
+    return files
+
+
+def _load_manifest(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def bundle_artifact(source_path: str, bundle_dir: str) -> Dict[str, Any]:
+    """Hash and pre-compress one file into bundle_dir; returns its manifest entry."""
+    with open(source_path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    name = hashed_name(source_path, digest)
+    entry: Dict[str, Any] = {
+        "source": os.path.basename(source_path),
+        "hash": digest,
+        "bytes": len(data),
+        "file": name,
+        "encodings": {},
+    }
+    encoders = [("", lambda d: d), (".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    for suffix, encode in encoders:
+        path = os.path.join(bundle_dir, name + suffix)
+        if not os.path.exists(path):  # content-addressed: an existing file already holds these bytes
+            _write_atomic(path, encode(data))
+        if suffix:
+            entry["encodings"][ENCODINGS[suffix]] = {"file": name + suffix, "bytes": os.path.getsize(path)}
+    return entry
+
+
+def build_bundle(
+    data_dir: str,
+    bundle_dir: Optional[str] = None,
+    artifacts: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Publish `artifacts` (default ARTIFACTS) from data_dir into bundle_dir (default
+    <data_dir>/bundle), write the manifest last and prune stale hashes. Returns the manifest."""
+    bundle_dir = bundle_dir or os.path.join(data_dir, BUNDLE_DIRNAME)
+    os.makedirs(bundle_dir, exist_ok=True)
+    manifest_path = os.path.join(bundle_dir, MANIFEST_FILENAME)
+    previous = _load_manifest(manifest_path)
+    prev_hashes = {k: v.get("hash") for k, v in ((previous or {}).get("artifacts") or {}).items()}
+
+    entries: Dict[str, Any] = {}
+    for key, filename in (artifacts or ARTIFACTS).items():
+        src = os.path.join(data_dir, filename)
+        if not os.path.exists(src):
+            continue
+        entry = bundle_artifact(src, bundle_dir)
+        entries[key] = entry
+        changed = entry["hash"] != prev_hashes.get(key)
+        sizes = ", ".join(f"{enc} {e['bytes']}" for enc, e in entry["encodings"].items())
+        logging.info(
+            f"Bundle {key}: {entry['file']} ({entry['bytes']} bytes; {sizes}){' [changed]' if changed else ''}",
+            extra={"event": "bundle_artifact", "artifact": key, "hash": entry["hash"], "changed": changed},
+        )
+
+    manifest = {
+        "version": 1,
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "artifacts": entries,
+    }
+    tmp = f"{manifest_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, manifest_path)
+
+    # Keep what the new and the previous manifest reference; drop older generations
+    keep = _manifest_files(manifest) | _manifest_files(previous) | {MANIFEST_FILENAME}
+    for name in os.listdir(bundle_dir):
+        if name not in keep:
+            try:
+                os.remove(os.path.join(bundle_dir, name))
+                logging.debug("Pruned stale bundle file %s", name)
+            except OSError:
+                pass
+    return manifest
+
+
+def publish_bundle(data_dir: str, artifacts: Optional[Dict[str, str]] = None) -> Optional[Dict[str, Any]]:
+    """build_bundle() as the last ETL stage: never raises. On failure the manifest is removed so
+    the dashboard reads the plain files instead of a bundle that no longer matches them."""
+    try:
+        manifest = build_bundle(data_dir, artifacts=artifacts)
+        logging.info(f"Dashboard bundle: {len(manifest['artifacts'])} artifacts in {os.path.join(data_dir, BUNDLE_DIRNAME)}")
+        return manifest
+    except Exception:
+        logging.exception("Building the dashboard data bundle failed; the dashboard falls back to the plain files")
+        try:
+            os.remove(os.path.join(data_dir, BUNDLE_DIRNAME, MANIFEST_FILENAME))
+        except OSError:
+            pass
+        return None
@@ -0,0 +1,261 @@
+"""
+Precomputed roster co-authorship graph (layout + metrics) for the dashboard.
+
+Built from the works store (one row per roster author x work), for every reporting view/bucket:
+- sparse incidence matrix B (works x roster authors); C = B.T @ B gives joint-publication counts
+  off the diagonal and per-author work counts on it;
+- degree, weighted degree (sum of joint pubs) and normalized betweenness (Brandes, unweighted, batched sparse BFS);
+- a force-directed (Fruchterman-Reingold) layout that is stable between runs: nodes start from
+  their position in the previous artifact (or a hash of their ID), and every bucket is warm-started
+  from the lifetime layout, so the picture doesn't reshuffle nightly or between year ranges.
+
+Output: coauthor_graph.json
+    {"generated": ..., "names": {author_id: name},
+     "buckets": {view: {"start_year", "end_year",
+                        "nodes": [{"id", "x", "y", "works", "degree", "weighted_degree", "betweenness"}],
+                        "edges": [[a, b, joint_pubs], ...]}}}
+Only authors with at least one in-roster co-author appear as nodes. Needs numpy + scipy; without
+scipy the stage is skipped with a warning.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from vetmic_etl import frames
+from vetmic_etl.works_db import short_id
+
+GRAPH_FILENAME = "coauthor_graph.json"
+LAYOUT_ITERATIONS = int(os.getenv("ETL_GRAPH_LAYOUT_ITERATIONS", "200"))
+BETWEENNESS_BLOCK_ELEMENTS = 1 << 20  # n x block planes of the batched BFS (8 MB each as float64)
+
+
+def _hash_position(node_id: str) -> Tuple[float, float]:
+    """Deterministic start position in [-1, 1]^2 from the node ID."""
+    h = hashlib.blake2b(node_id.encode("utf-8"), digest_size=8).digest()
+    return (int.from_bytes(h[:4], "big") / 2**31 - 1.0, int.from_bytes(h[4:], "big") / 2**31 - 1.0)
+
+
+# ----------------------------
+# Graph construction
+# ----------------------------
+
+def cooccurrence(pairs: pd.DataFrame, author_ids: List[str]):
+    """Sparse author x author joint-publication matrix from (work_id, author_id) rows."""
+    from scipy import sparse
+
+    col_of = {a: i for i, a in enumerate(author_ids)}
+    pairs = pairs[pairs["author_id"].isin(col_of)].drop_duplicates()
+    work_codes, _ = pd.factorize(pairs["work_id"])
+    cols = pairs["author_id"].map(col_of).to_numpy()
+    incidence = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.int32), (work_codes, cols)),
+        shape=(int(work_codes.max()) + 1 if len(work_codes) else 0, len(author_ids)),
+    )
+    return (incidence.T @ incidence).tocsr()
+
+
+def betweenness(adj) -> np.ndarray:
+    """Brandes' betweenness centrality on an unweighted undirected CSR adjacency, normalized to [0, 1].
+
+    Level-synchronous: a block of sources is swept at once, each BFS level (and each level of the
+    dependency back-propagation) being one sparse x dense product over n x block planes, so the cost
+    is a few sparse products per level rather than a Python loop per node and neighbour."""
+    n = adj.shape[0]
+    bc = np.zeros(n)
+    if n <= 2:
+        return bc
+    a = (adj != 0).astype(np.float64).tocsr()
+    block = max(1, min(n, BETWEENNESS_BLOCK_ELEMENTS // n))
+    for lo in range(0, n, block):
+        src = np.arange(lo, min(lo + block, n))
+        cols = np.arange(len(src))
+        # column j is the BFS from src[j]: shortest-path counts and depths
+        sigma = np.zeros((n, len(src)))
+        sigma[src, cols] = 1.0
+        dist = np.full((n, len(src)), -1, dtype=np.int32)
+        dist[src, cols] = 0
+        frontier = sigma.copy()
+        depth = 0
+        while True:
+            reach = a @ frontier  # paths arriving from the current level
+            new = (reach > 0) & (dist < 0)
+            if not new.any():
+                break
+            depth += 1
+            dist[new] = depth
+            sigma[new] = reach[new]
+            frontier = np.where(new, sigma, 0.0)
+        # delta[v] += sigma[v] * sum over successors w of (1 + delta[w]) / sigma[w], deepest level first
+        delta = np.zeros_like(sigma)
+        coeff = np.empty_like(sigma)
+        for d in range(depth, 0, -1):
+            coeff.fill(0.0)
+            np.divide(1.0 + delta, sigma, out=coeff, where=dist == d)
+            back = a @ coeff
+            delta += np.where(dist == d - 1, sigma * back, 0.0)
+        delta[src, cols] = 0.0  # a source's own dependency isn't betweenness
+        bc += delta.sum(axis=1)
+    bc /= 2.0  # undirected: each path counted from both ends
+    bc /= (n - 1) * (n - 2) / 2.0
+    return bc
+
+
+def force_layout(adj, init: np.ndarray, iterations: int = LAYOUT_ITERATIONS) -> np.ndarray:
+    """Fruchterman-Reingold on a weighted CSR adjacency, starting from `init` (n x 2). Deterministic.
+
+    The x and y offsets are kept as two n x n planes updated in place, not an n x n x 2 tensor plus
+    temporaries; for a large roster this dense step is what sets the ETL's peak RSS."""
+    n = adj.shape[0]
+    pos = init.astype(float).copy()
+    if n <= 1:
+        return np.zeros((n, 2))
+    k = 1.0 / np.sqrt(n)
+    weight = adj.toarray().astype(float)
+    np.log1p(weight, out=weight)  # heavy collaborations pull harder, but not overwhelmingly
+    dx, dy, dist, force = (np.empty((n, n)) for _ in range(4))
+    temp = 0.1
+    cooling = temp / (iterations + 1)
+    for _ in range(iterations):
+        np.subtract.outer(pos[:, 0], pos[:, 0], out=dx)
+        np.subtract.outer(pos[:, 1], pos[:, 1], out=dy)
+        np.multiply(dx, dx, out=dist)
+        np.multiply(dy, dy, out=force)
+        dist += force
+        np.sqrt(dist, out=dist)
+        np.fill_diagonal(dist, 1.0)
+        np.maximum(dist, 0.01, out=dist)
+        # force = k^2 / dist^2 - weight * dist / k  (repulsion - attraction, per unit vector)
+        np.multiply(weight, dist, out=force)
+        force /= k
+        np.square(dist, out=dist)
+        np.divide(k * k, dist, out=dist)
+        np.subtract(dist, force, out=force)
+        np.fill_diagonal(force, 0.0)
+        # force is symmetric and dx/dy antisymmetric, so -(column sums) are the per-node row sums;
+        # summing down axis 0 adds in the same order as the n x n x 2 version did
+        dx *= force
+        dy *= force
+        disp = -np.column_stack((dx.sum(axis=0), dy.sum(axis=0)))
+        length = np.maximum(np.sqrt((disp ** 2).sum(-1)), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, temp)[:, None]
+        temp -= cooling
+    pos -= pos.mean(axis=0)
+    scale = np.abs(pos).max() or 1.0
+    return pos / scale
+
+
+def _load_previous_positions(path: str) -> Dict[str, Tuple[float, float]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            prev = json.load(f)
+        nodes = (prev.get("buckets", {}).get("lifetime") or next(iter(prev.get("buckets", {}).values()), {})).get("nodes", [])
+        return {n["id"]: (float(n["x"]), float(n["y"])) for n in nodes}
+    except (OSError, ValueError, StopIteration, AttributeError, KeyError, TypeError):
+        return {}
+
+
+def build_bucket(pairs: pd.DataFrame, author_ids: List[str], seed_pos: Dict[str, Tuple[float, float]]) -> Dict[str, object]:
+    """Nodes/edges/metrics/layout for one set of (work_id, author_id) rows."""
+    from scipy import sparse
+
+    co = cooccurrence(pairs, author_ids)
+    works = co.diagonal()
+    co.setdiag(0)
+    co.eliminate_zeros()
+
+    keep = np.flatnonzero(co.getnnz(axis=1) > 0)
+    if not len(keep):
+        return {"nodes": [], "edges": []}
+    sub = co[keep][:, keep].tocsr()
+    ids = [author_ids[i] for i in keep]
+
+    init = np.array([seed_pos.get(a) or _hash_position(a) for a in ids])
+    pos = force_layout(sub, init)
+    bc = betweenness(sub)
+    degree = sub.getnnz(axis=1)
+    weighted = np.asarray(sub.sum(axis=1)).ravel()
+
+    nodes = [
+        {
+            "id": a,
+            "x": round(float(pos[i, 0]), 4),
+            "y": round(float(pos[i, 1]), 4),
+            "works": int(works[keep[i]]),
+            "degree": int(degree[i]),
+            "weighted_degree": int(weighted[i]),
+            "betweenness": round(float(bc[i]), 4),
+        }
+        for i, a in enumerate(ids)
+    ]
+    upper = sparse.triu(sub, k=1).tocoo()
+    edges = sorted([ids[r], ids[c], int(v)] for r, c, v in zip(upper.row, upper.col, upper.data))
+    return {"nodes": nodes, "edges": edges}
+
+
+# ----------------------------
+# Stage entry point
+# ----------------------------
+
+def build_coauthor_graph(
+    store_path: str,
+    roster_names: Dict[str, str],
+    views: Dict[str, Dict[str, object]],
+    out_path: str,
+    store: Optional[pd.DataFrame] = None,
+) -> Optional[str]:
+    """Write the co-authorship artifact for every view in `views` (the works_store manifest entries,
+    which carry start_year/end_year). roster_names maps any OpenAlex ID form to a display name.
+    `store` is the already-parsed store, as for works_store.materialize_views()."""
+    if importlib.util.find_spec("scipy") is None:  # optional dependency
+        logging.warning("scipy not installed; skipping co-author graph stage")
+        return None
+
+    names = {short_id(k): v for k, v in roster_names.items() if short_id(k)}
+    if store is None:
+        store = frames.read_compact_csv(store_path)
+    pairs = pd.DataFrame({
+        "work_id": store["id"].astype("string"),
+        "author_id": store["author_openalex_id"].astype("string").map(short_id, na_action="ignore"),
+        "year": store["publication_year"],
+    }).dropna(subset=["work_id", "author_id"])
+    author_ids = sorted(set(names) | set(pairs["author_id"]))
+
+    seed_pos = _load_previous_positions(out_path)
+    ordered = sorted(views.items(), key=lambda kv: kv[0] != "lifetime")  # lifetime first, seeds the rest
+    buckets: Dict[str, Dict[str, object]] = {}
+    for view, meta in ordered:
+        start, end = meta.get("start_year"), meta.get("end_year")
+        years = pairs["year"]
+        mask = pd.Series(True, index=pairs.index)
+        if start is not None:
+            mask &= (years >= int(start)).fillna(False)
+        if end is not None:
+            mask &= (years <= int(end)).fillna(False)
+        bucket = build_bucket(pairs.loc[mask, ["work_id", "author_id"]], author_ids, seed_pos)
+        bucket.update({"start_year": start, "end_year": end})
+        buckets[view] = bucket
+        if view == "lifetime":
+            seed_pos = {**seed_pos, **{n["id"]: (n["x"], n["y"]) for n in bucket["nodes"]}}
+        logging.info(f"Co-author graph {view}: {len(bucket['nodes'])} nodes, {len(bucket['edges'])} edges")
+
+    used = {n["id"] for b in buckets.values() for n in b["nodes"]}
+    payload = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "names": {a: names.get(a, a) for a in sorted(used)},
+        "buckets": {v: buckets[v] for v in views if v in buckets},
+    }
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, out_path)
+    return out_path
@@ -0,0 +1,107 @@
+"""
+Memory-compact dtypes for the projected works tables.
+
+The works/authorship tables repeat a handful of values millions of times over (work type, OA status,
+venue, topic/field/subfield names, the tagged author). Stored as Python object columns, each cell is a
+separate str object; as categoricals they are one small integer code per row plus a dictionary.
+
+What this buys is a smaller *resident* frame (about 30% smaller on the 100k-work synthetic table in
+benchmarks/bench_memory.py), not a lower *peak* RSS: the peak is set while the parser builds the
+free-text columns (titles, author/institution/concept lists, IDs), which are Python strings either
+way, and compact peaks within a few MB of a plain pd.read_csv (at 20k works, slightly above it).
+In the full post-harvest stage the peak comes from the co-author graph layout, not this table.
+
+- CATEGORY_COLUMNS   -> "category" (dictionary-encoded)
+- INTEGER_COLUMNS    -> nullable "Int32"/"Int64" (years/counts with missing values stay integers)
+- FLOAT_COLUMNS      -> "Float64"
+- everything else    -> pandas "string" dtype; storage from ETL_STRING_STORAGE ("python" by default,
+                        "pyarrow" for Arrow-backed buffers when pyarrow is installed)
+
+Why "python" by default: Arrow strings make the resident table much smaller, but drop_duplicates()
+on them materialises Python objects and pyarrow's allocator keeps the freed pool, so the *peak* RSS
+of load + dedup ends up higher than with the parser's interned Python strings. Measure with
+benchmarks/bench_memory.py before switching.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+# pandas is imported inside the functions: the CLIs import this module (via works_store) before
+# parsing arguments, and `--help` should not pay for it
+if TYPE_CHECKING:
+    import pandas as pd
+
+STRING_STORAGE = os.getenv("ETL_STRING_STORAGE", "python")
+if STRING_STORAGE == "pyarrow" and importlib.util.find_spec("pyarrow") is None:  # optional dependency
+    STRING_STORAGE = "python"
+
+CATEGORY_COLUMNS = [
+    "type", "open_access__oa_status",
+    "host_venue__display_name", "primary_location__source__display_name",
+    "primary_topic__display_name", "primary_topic__field__display_name", "primary_topic__subfield__display_name",
+    "author_name", "author_openalex_id",
+]
+INTEGER_COLUMNS = {
+    "publication_year": "Int32",
+    "cited_by_count": "Int64",
+}
+FLOAT_COLUMNS = ["fwci"]
+
+
+@lru_cache(maxsize=None)
+def string_dtype() -> pd.StringDtype:
+    """pandas string dtype for the configured STRING_STORAGE (built on first use, not at import)."""
+    import pandas as pd
+
+    return pd.StringDtype(STRING_STORAGE)
+
+
+def csv_dtypes(columns: Optional[Iterable[str]] = None) -> Dict[str, object]:
+    """dtype= mapping for pd.read_csv on the compiled/dedup CSVs, so they are parsed straight into the
+    compact representation. Limited to `columns` when given. Non-numeric values in the integer
+    columns would fail the parse; compact_frame() coerces instead."""
+    mapping: Dict[str, object] = {c: "category" for c in CATEGORY_COLUMNS}
+    mapping.update(INTEGER_COLUMNS)
+    mapping.update({c: "Float64" for c in FLOAT_COLUMNS})
+    if columns is not None:
+        wanted = set(columns)
+        mapping = {c: t for c, t in mapping.items() if c in wanted}
+    return mapping
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert a projected works table to compact dtypes (in place where possible; returns df)."""
+    import pandas as pd
+
+    string = string_dtype()
+    for col in df.columns:
+        s = df[col]
+        if col in INTEGER_COLUMNS:
+            df[col] = pd.to_numeric(s, errors="coerce").round().astype(INTEGER_COLUMNS[col])
+        elif col in FLOAT_COLUMNS:
+            df[col] = pd.to_numeric(s, errors="coerce").astype("Float64")
+        elif col in CATEGORY_COLUMNS:
+            if not isinstance(s.dtype, pd.CategoricalDtype):
+                df[col] = s.astype(string).astype("category")
+        elif s.dtype == object or pd.api.types.is_string_dtype(s.dtype):
+            if s.dtype != string:
+                df[col] = s.astype(string)
+    return df
+
+
+def read_compact_csv(path: str, **kwargs) -> pd.DataFrame:
+    """pd.read_csv with compact dtypes for the known columns and Arrow/str dtype for the rest."""
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = csv_dtypes(header)
+    dtypes.update({c: string_dtype() for c in header if c not in dtypes})
+    try:
+        return pd.read_csv(path, dtype=dtypes, **kwargs)
+    except (ValueError, TypeError):
+        # e.g. a non-numeric publication_year sneaked in; fall back to parse-then-coerce
+        return compact_frame(pd.read_csv(path, **kwargs))
@@ -0,0 +1,532 @@
+"""
+OpenAlex author metrics for a roster file (library side of etl/fetch_author_metrics.py).
+
+- Robust detection of the OpenAlex ID / ORCID columns (many header variants and ID formats: raw
+  A..., openalex:..., human URL, API URL).
+- If a row has only an OpenAlex ID or only an ORCID, the missing identifier is looked up via the
+  OpenAlex API (resolve_author_ids).
+- Gentle API usage (User-Agent with optional mailto, retry with backoff, delay between calls) over
+  one reusable requests.Session.
+- fetch_metrics() appends H_index, I10_index, Works_count, Total_citations to the roster, records
+  the run in the metrics history store (vetmic_etl.metrics_history) and optionally logs deltas.
+
+Usage
+-----
+    from vetmic_etl import fetch_metrics
+    df = fetch_metrics("data/roster.csv", "data/roster_with_metrics.csv", log_diffs=True)
+
+Nothing here parses arguments or configures logging; the CLI does that.
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from vetmic_etl import metrics_history
+
+OPENALEX_BASE = "https://api.openalex.org"
+METRIC_FIELDS = ["Display_name", "H_index", "I10_index", "Works_count", "Total_citations"]
+
+
+class MissingIdColumnError(ValueError):
+    """The roster has neither an OpenAlex ID nor an ORCID column."""
+
+
+# ------------------------- Column detection -------------------------
+
+def cell_text(value: Any) -> str:
+    """Roster cell as stripped text; empty cells (None/NaN, as read by pandas) become ""."""
+    text = (str(value) if value is not None else "").strip()
+    return "" if text.lower() in {"nan", "none", "<na>"} else text
+
+
+def _normalize(s: Any) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(s).lower())
+
+
+def find_openalex_col(columns) -> Optional[str]:
+    """Return the column that contains OpenAlex Author IDs.
+
+    Accepts common variants such as:
+    - OpenAlexID / OpenAlex ID / openalex_id / openalex author id
+    - Any header whose normalized form contains BOTH "openalex" and "id".
+    """
+    norm_map = {_normalize(c): c for c in columns}
+
+    # Direct patterns
+    for norm, real in norm_map.items():
+        if "openalex" in norm and norm.endswith("id"):
+            return real
+        if norm in {
+            "openalexid", "openalexauthorid", "openalex_id",
+            "openalexauthor_id", "openalexauthorid",
+        }:
+            return real
+
+    # Last resort: a literal "openalex" column
+    for norm, real in norm_map.items():
+        if norm == "openalex":
+            return real
+    return None
+
+
+def find_orcid_col(columns) -> Optional[str]:
+    """Return the column that contains ORCIDs (if present)."""
+    norm_map = {_normalize(c): c for c in columns}
+    candidates = [
+        "orcid", "orcidid", "orcid_id", "orcidiD", "orcididentifier",
+        "orcidlink", "orcidurl", "orcid_i_d",
+    ]
+    for norm, real in norm_map.items():
+        if norm in candidates:
+            return real
+        if "orcid" in norm:
+            return real
+    return None
+
+# ------------------------- ID normalization -------------------------
+
+def normalize_author_id(author_id: str) -> str:
+    """Convert various forms of an OpenAlex author id into a canonical API URL.
+    Supported inputs include raw IDs (A...), openalex: prefix, and https URLs.
+    Returns an API URL: https://api.openalex.org/authors/Axxxxxx
+    """
+    aid = (str(author_id) if author_id is not None else "").strip()
+    if not aid or aid.lower() in {"nan", "none"}:
+        return ""
+
+    # Human site URL -> API endpoint
+    if aid.startswith("https://openalex.org/") or aid.startswith("http://openalex.org/"):
+        last = aid.rstrip("/").split("/")[-1]
+        if last and last[0].lower() == "a":
+            last = "A" + last[1:]
+        return f"{OPENALEX_BASE}/authors/{last}"
+
+    # Already API URL
+    if aid.startswith("https://api.openalex.org/") or aid.startswith("http://api.openalex.org/"):
+        return aid
+
+    # openalex: prefix
+    if aid.lower().startswith("openalex:"):
+        aid = aid.split(":", 1)[1]
+
+    # Bare ID -> ensure uppercase A
+    if aid and aid[0].lower() == "a":
+        aid = "A" + aid[1:]
+
+    return f"{OPENALEX_BASE}/authors/{aid}"
+
+
+def normalize_orcid(orcid: str) -> str:
+    """Return ORCID in bare 16-digit form with hyphens (e.g., 0000-0002-1825-0097).
+    Accepts full URLs or bare values; returns "" for missing.
+    """
+    val = (str(orcid) if orcid is not None else "").strip()
+    if not val or val.lower() in {"nan", "none"}:
+        return ""
+    # Extract the last 19 chars if a URL was provided
+    m = re.search(r"(\d{4}-\d{4}-\d{4}-[\dX]{4})", val)
+    if m:
+        return m.group(1)
+    # Insert hyphens if a compact 16-char form
+    digits = re.sub(r"[^0-9X]", "", val)
+    if len(digits) == 16:
+        return f"{digits[0:4]}-{digits[4:8]}-{digits[8:12]}-{digits[12:16]}"
+    return val
+
+# ------------------------- HTTP helpers -------------------------
+
+def build_session(email: Optional[str]) -> requests.Session:
+    session = requests.Session()
+    ua = "openalex-metrics/1.2"
+    if email:
+        ua += f" ({email})"
+    session.headers.update({"User-Agent": ua})
+    session.timeout = 30
+    return session
+
+
+def _get(session: requests.Session, url: str, params: Dict[str, Any], *, max_tries: int = 3, backoff: float = 1.0) -> Optional[requests.Response]:
+    for attempt in range(1, max_tries + 1):
+        try:
+            resp = session.get(url, params=params, timeout=30)
+            if resp.status_code == 429 or 500 <= resp.status_code < 600:
+                logging.warning("HTTP %s from %s; retrying (attempt %d/%d)", resp.status_code, url, attempt, max_tries)
+                time.sleep(backoff)
+                backoff *= 2
+                continue
+            resp.raise_for_status()
+            return resp
+        except requests.RequestException as e:
+            logging.warning("Request error: %s; retrying (attempt %d/%d)", e, attempt, max_tries)
+            time.sleep(backoff)
+            backoff *= 2
+    logging.error("Failed after %d attempts: %s", max_tries, url)
+    return None
+
+# ------------------------- OpenAlex fetch -------------------------
+
+def fetch_author(url_or_id: str, session: requests.Session, *, email: Optional[str], max_tries: int = 3, backoff: float = 1.0) -> Optional[Dict[str, Any]]:
+    """Fetch author data from OpenAlex. Returns JSON dict or None on failure."""
+    url = normalize_author_id(url_or_id)
+    if not url:
+        return None
+    params = {
+        # h_index, i10_index live under summary_stats
+        "select": "id,display_name,works_count,cited_by_count,orcid,summary_stats",
+    }
+    if email:
+        params["mailto"] = email
+    resp = _get(session, url, params, max_tries=max_tries, backoff=backoff)
+    if not resp:
+        return None
+    try:
+        return resp.json()
+    except Exception:
+        logging.error("Could not parse JSON from %s", url)
+        return None
+
+
+def fetch_by_orcid(orcid: str, session: requests.Session, *, email: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Fetch an author object using an ORCID (bare or URL)."""
+    norm = normalize_orcid(orcid)
+    if not norm:
+        return None
+    # OpenAlex supports path form /authors/orcid:<id>
+    url = f"{OPENALEX_BASE}/authors/orcid:{norm}"
+    params: Dict[str, Any] = {"select": "id,display_name,works_count,cited_by_count,orcid,summary_stats"}
+    if email:
+        params["mailto"] = email
+    resp = _get(session, url, params, max_tries=3, backoff=1.0)
+    if not resp:
+        return None
+    try:
+        return resp.json()
+    except Exception:
+        logging.error("Could not parse JSON from %s", url)
+        return None
+
+# ------------------------- Transform -------------------------
+
+def extract_metrics(author_json: Dict[str, Any]) -> Dict[str, Any]:
+    ss = author_json.get("summary_stats") or {}
+    return {
+        "Display_name": author_json.get("display_name"),
+        "OpenAlexID": author_json.get("id"),
+        "ORCID": author_json.get("orcid"),
+        "H_index": ss.get("h_index"),
+        "I10_index": ss.get("i10_index"),
+        "Works_count": author_json.get("works_count"),
+        "Total_citations": author_json.get("cited_by_count"),
+    }
+
+# ------------------------- IO -------------------------
+
+def read_input(path: str) -> pd.DataFrame:
+    ext = os.path.splitext(path.lower())[1]
+    if ext in [".xlsx", ".xls"]:
+        return pd.read_excel(path)
+    if ext in [".csv", ".tsv"]:
+        sep = "," if ext == ".csv" else "\t"
+        return pd.read_csv(path, sep=sep)
+    raise ValueError("Unsupported input format. Use .csv, .tsv, .xlsx, or .xls")
+
+
+def write_output(df: pd.DataFrame, out_path: str) -> None:
+    df.to_csv(out_path, index=False, quoting=csv.QUOTE_MINIMAL)
+    logging.info("[ok] Wrote: %s", out_path)
+
+# ------------------------- Cross-resolve IDs -------------------------
+
+def resolve_missing_ids(df: pd.DataFrame, *, openalex_col: Optional[str], orcid_col: Optional[str], session: requests.Session, email: Optional[str], delay: float) -> pd.DataFrame:
+    """For each row, if either OpenAlexID or ORCID is missing but the other exists, look up the missing one.
+    Returns an updated DataFrame with both columns filled where possible.
+    The function does not write to disk; it only updates the in-memory df.
+    """
+    # Ensure we have explicit columns in the df for output consistency
+    if openalex_col is None:
+        openalex_col = "OpenAlexID"
+        if "OpenAlexID" not in df.columns:
+            df[openalex_col] = ""
+    if orcid_col is None:
+        orcid_col = "ORCID"
+        if "ORCID" not in df.columns:
+            df[orcid_col] = ""
+
+    cache_by_openalex: Dict[str, Dict[str, Any]] = {}
+    cache_by_orcid: Dict[str, Dict[str, Any]] = {}
+
+    for idx, row in df.iterrows():
+        raw_openalex = cell_text(row.get(openalex_col))
+        raw_orcid = cell_text(row.get(orcid_col))
+
+        have_openalex = bool(raw_openalex)
+        have_orcid = bool(normalize_orcid(raw_orcid))
+
+        author_obj: Optional[Dict[str, Any]] = None
+
+        if have_openalex and have_orcid:
+            # Nothing to do
+            continue
+
+        if have_openalex and not have_orcid:
+            key = normalize_author_id(raw_openalex)
+            author_obj = cache_by_openalex.get(key)
+            if not author_obj:
+                author_obj = fetch_author(raw_openalex, session, email=email)
+                if author_obj:
+                    cache_by_openalex[key] = author_obj
+                    time.sleep(delay)
+            if author_obj:
+                df.at[idx, orcid_col] = author_obj.get("orcid") or ""
+            continue
+
+        if have_orcid and not have_openalex:
+            norm = normalize_orcid(raw_orcid)
+            author_obj = cache_by_orcid.get(norm)
+            if not author_obj:
+                author_obj = fetch_by_orcid(norm, session, email=email)
+                if author_obj:
+                    cache_by_orcid[norm] = author_obj
+                    time.sleep(delay)
+            if author_obj:
+                df.at[idx, openalex_col] = author_obj.get("id") or ""
+            continue
+
+    return df
+
+# ------------------------- History -------------------------
+
+def log_history_diffs(conn, run_date: str) -> bool:
+    """Log per-author deltas between the previous run in the history store and run_date.
+    Returns False when there is no earlier run to compare against."""
+    prev_date = metrics_history.previous_run_date(conn, run_date)
+    if not prev_date:
+        logging.info("[diff] no earlier run in metrics history; nothing to compare")
+        return False
+
+    rows = metrics_history.deltas_since(conn, prev_date)
+    cols = list(metrics_history.METRIC_COLUMNS)
+    for col in cols:
+        deltas = [r[f"{col}_delta"] for r in rows if r["to_date"] == run_date and r[f"{col}_delta"]]
+        logging.info("[diff] %s: %d authors changed since %s; total delta = %s", col, len(deltas), prev_date, sum(deltas))
+    for r in rows:
+        changes = {c: r[f"{c}_delta"] for c in cols if r[f"{c}_delta"]}
+        if r["to_date"] == run_date and changes:
+            logging.info(
+                "[diff] %s (%s): %s", r["display_name"] or r["author_id"], r["author_id"],
+                ", ".join(f"{c} {d:+d}" for c, d in changes.items()),
+                extra={"event": "metrics_delta", "author_id": r["author_id"], "since": prev_date, **changes},
+            )
+    return True
+
+
+# ------------------------- API -------------------------
+
+def contact_email(email: Optional[str] = None) -> Optional[str]:
+    """Explicit email, else $OPENALEX_MAILTO, else $CONTACT_EMAIL."""
+    return email or os.environ.get("OPENALEX_MAILTO") or os.environ.get("CONTACT_EMAIL")
+
+
+def id_columns(df: pd.DataFrame) -> Tuple[str, str]:
+    """(openalex_col, orcid_col) of the roster, creating "OpenAlexID"/"ORCID" when only the other
+    exists. Raises MissingIdColumnError when the roster has neither."""
+    openalex_col = find_openalex_col(df.columns)
+    orcid_col = find_orcid_col(df.columns)
+    if openalex_col is None and orcid_col is None:
+        raise MissingIdColumnError("No OpenAlex ID or ORCID column detected. Please add one.")
+    for col, default in ((openalex_col, "OpenAlexID"), (orcid_col, "ORCID")):
+        if col is None and default not in df.columns:
+            df[default] = ""
+    return openalex_col or "OpenAlexID", orcid_col or "ORCID"
+
+
+def resolve_author_ids(
+    df: pd.DataFrame,
+    *,
+    session: Optional[requests.Session] = None,
+    email: Optional[str] = None,
+    delay: float = 0.25,
+) -> Tuple[pd.DataFrame, str, str]:
+    """Fill in missing OpenAlex IDs / ORCIDs from the other identifier.
+    Returns (df, openalex_col, orcid_col); see id_columns()."""
+    openalex_col, orcid_col = id_columns(df)
+    session = session or build_session(email)
+    df = resolve_missing_ids(df, openalex_col=openalex_col, orcid_col=orcid_col, session=session, email=email, delay=delay)
+    return df, openalex_col, orcid_col
+
+
+def fetch_author_row(author_id: Any, orcid: Any, session: requests.Session, *, email: Optional[str], delay: float = 0.0) -> Dict[str, Any]:
+    """Metrics row for one roster entry; prefers the OpenAlex ID and falls back to the ORCID.
+    Unresolvable authors get a row with the identifiers and empty metrics."""
+    author_id, orcid = cell_text(author_id), cell_text(orcid)
+    author_json: Optional[Dict[str, Any]] = None
+    if author_id:
+        author_json = fetch_author(author_id, session, email=email)
+    elif normalize_orcid(orcid):
+        author_json = fetch_by_orcid(orcid, session, email=email)
+    if author_json:
+        time.sleep(delay)
+        return extract_metrics(author_json)
+    return empty_metrics_row(author_id, orcid)
+
+
+def empty_metrics_row(author_id: Any, orcid: Any) -> Dict[str, Any]:
+    """Output row for an author that could not be fetched: identifiers only."""
+    return {
+        "Display_name": None,
+        "OpenAlexID": cell_text(author_id),
+        "ORCID": normalize_orcid(cell_text(orcid)) or "",
+        "H_index": None,
+        "I10_index": None,
+        "Works_count": None,
+        "Total_citations": None,
+    }
+
+
+def fetch_metric_rows(
+    df: pd.DataFrame,
+    openalex_col: str,
+    orcid_col: str,
+    *,
+    session: requests.Session,
+    email: Optional[str] = None,
+    delay: float = 0.25,
+) -> List[Dict[str, Any]]:
+    """One extract_metrics()-shaped row per roster row, in roster order."""
+    return [
+        fetch_author_row(row.get(openalex_col), row.get(orcid_col), session, email=email, delay=delay)
+        for _, row in df.iterrows()
+    ]
+
+
+def record_history(out_rows: List[Dict[str, Any]], history_db: str, history_json: str, *, log_diffs: bool = False) -> bool:
+    """Append this run to the history store (keyed by author + run date) and refresh the dashboard
+    export. Returns True when per-author deltas were logged. Never raises."""
+    try:
+        run_date = datetime.now().date().isoformat()
+        seed = not os.path.exists(history_db) and os.path.exists(history_json)
+        conn = metrics_history.open_history(history_db)
+        try:
+            if seed:  # store not restored from the cache: rebuild it from the committed export
+                n = metrics_history.import_history_json(conn, history_json)
+                logging.info("[history] seeded %s with %d snapshots from %s", history_db, n, history_json)
+            n = metrics_history.record_snapshot(conn, out_rows, run_date=run_date)
+            logging.info("[history] recorded %d author snapshots for %s in %s", n, run_date, history_db)
+            logged = log_history_diffs(conn, run_date) if log_diffs else False
+            metrics_history.export_history_json(conn, history_json)
+            logging.info("[history] exported %s", history_json)
+            return logged
+        finally:
+            conn.close()
+    except Exception:
+        logging.exception("Failed to update metrics history at %s", history_db)
+        return False
+
+
+def log_aggregate_diffs(prev_df: pd.DataFrame, out_df: pd.DataFrame) -> None:
+    """Fallback: simple aggregate deltas vs the previous output (only meaningful if rows line up)."""
+    if len(prev_df) != len(out_df):
+        return
+    for col in ("H_index", "I10_index", "Works_count", "Total_citations"):
+        if col in prev_df.columns and col in out_df.columns:
+            diffs = out_df[col].fillna(0).astype(float) - prev_df[col].fillna(0).astype(float)
+            changed = int((diffs != 0).sum())
+            total_delta = float(diffs.sum())
+            logging.info("[diff] %s: %d rows changed; total delta = %s", col, changed, total_delta)
+
+
+def merge_metrics(df: pd.DataFrame, out_rows: List[Dict[str, Any]], openalex_col: str, orcid_col: str) -> pd.DataFrame:
+    """Roster with the finalized identifiers and the metric columns appended (rows aligned by order)."""
+    out_df = pd.DataFrame(out_rows)
+    merged = df.copy()
+    merged[openalex_col] = out_df["OpenAlexID"]
+    merged[orcid_col] = out_df["ORCID"]
+    for col in METRIC_FIELDS:
+        merged[col] = out_df[col]
+    return merged
+
+
+def default_output_path(in_path: str) -> str:
+    """<input>_with_metrics.csv, fetch_metrics()'s default output."""
+    return f"{os.path.splitext(in_path)[0]}_with_metrics.csv"
+
+
+def history_paths(out_path: str, history_db: Optional[str] = None, history_json: Optional[str] = None) -> Tuple[str, str]:
+    """(history_db, history_json), defaulting to metrics_history.sqlite/.json next to out_path."""
+    out_dir = os.path.dirname(out_path) or "."
+    return (
+        history_db or os.path.join(out_dir, "metrics_history.sqlite"),
+        history_json or os.path.join(out_dir, "metrics_history.json"),
+    )
+
+
+def write_metrics(
+    df: pd.DataFrame,
+    out_rows: List[Dict[str, Any]],
+    openalex_col: str,
+    orcid_col: str,
+    out_path: str,
+    *,
+    log_diffs: bool = False,
+    history_db: Optional[str] = None,
+    history_json: Optional[str] = None,
+    record: bool = True,
+) -> pd.DataFrame:
+    """Record the run in the history store, log deltas, merge the metrics into the roster and
+    write out_path. history_db/history_json default to metrics_history.sqlite/.json next to out_path."""
+    history_db, history_json = history_paths(out_path, history_db, history_json)
+
+    prev_df: Optional[pd.DataFrame] = None
+    if log_diffs and os.path.exists(out_path):
+        try:
+            prev_df = pd.read_csv(out_path)
+        except Exception:
+            prev_df = None
+
+    history_logged = record_history(out_rows, history_db, history_json, log_diffs=log_diffs) if record else False
+    if not history_logged and prev_df is not None:
+        log_aggregate_diffs(prev_df, pd.DataFrame(out_rows))
+
+    merged = merge_metrics(df, out_rows, openalex_col, orcid_col)
+    write_output(merged, out_path)
+    return merged
+
+
+def fetch_metrics(
+    in_path: str,
+    out_path: Optional[str] = None,
+    *,
+    email: Optional[str] = None,
+    delay: float = 0.25,
+    log_diffs: bool = False,
+    history_db: Optional[str] = None,
+    history_json: Optional[str] = None,
+    record: bool = True,
+    session: Optional[requests.Session] = None,
+) -> pd.DataFrame:
+    """Read the roster, resolve IDs, fetch metrics, record history and write out_path
+    (default <input>_with_metrics.csv). Returns the merged roster; see write_metrics() for the
+    history options. email defaults to contact_email()."""
+    out_path = out_path or default_output_path(in_path)
+    email = contact_email(email)
+
+    df = read_input(in_path)
+    session = session or build_session(email)
+
+    # First: fill missing IDs using the other identifier, if present
+    df, openalex_col, orcid_col = resolve_author_ids(df, session=session, email=email, delay=delay)
+    out_rows = fetch_metric_rows(df, openalex_col, orcid_col, session=session, email=email, delay=delay)
+    return write_metrics(
+        df, out_rows, openalex_col, orcid_col, out_path,
+        log_diffs=log_diffs, history_db=history_db, history_json=history_json, record=record,
+    )
@@ -0,0 +1,251 @@
+"""
+Append-only history of per-author OpenAlex metrics (SQLite, stdlib only).
+
+fetch_author_metrics.py overwrites roster_with_metrics.csv on every run; this store keeps one
+snapshot per (author, run date) so past values survive without digging through git history.
+
+Table
+-----
+metrics_history(author_id, run_date, display_name, orcid,
+                h_index, i10_index, works_count, total_citations)
+
+- author_id is the bare OpenAlex ID (A##########); run_date is YYYY-MM-DD.
+- Primary key (author_id, run_date), WITHOUT ROWID, so one author's series is a contiguous
+  range scan; a run_date index serves "what changed since X" queries.
+- Rows are never updated across dates. Re-running on the same day replaces that day's snapshot.
+
+Dashboard export
+----------------
+export_history_json() writes one small JSON file in a change-point encoding: per author, only
+the snapshots where any metric differs from the previous one are listed (forward-fill to read).
+The SQLite file is a CI cache, not a committed file; import_history_json() re-seeds an empty store
+from the committed export, which loses only the unchanged snapshots between change points.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from vetmic_etl.works_db import short_id
+
+METRIC_COLUMNS = {
+    # roster/CSV column -> history column
+    "H_index": "h_index",
+    "I10_index": "i10_index",
+    "Works_count": "works_count",
+    "Total_citations": "total_citations",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics_history (
+    author_id       TEXT NOT NULL,
+    run_date        TEXT NOT NULL,
+    display_name    TEXT,
+    orcid           TEXT,
+    h_index         INTEGER,
+    i10_index       INTEGER,
+    works_count     INTEGER,
+    total_citations INTEGER,
+    PRIMARY KEY (author_id, run_date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_metrics_history_run_date ON metrics_history (run_date);
+"""
+
+
+def _as_int(val: Any) -> Optional[int]:
+    """CSV/pandas metric values arrive as float/NaN/None/str; store as INTEGER or NULL."""
+    try:
+        f = float(val)
+    except (TypeError, ValueError):
+        return None
+    return None if f != f else int(f)  # NaN check
+
+
+def months_ago(d: date, months: int) -> date:
+    """Calendar-month arithmetic without dateutil; clamps the day (e.g. Mar 31 - 1 month -> Feb 28/29)."""
+    y, m = divmod(d.year * 12 + (d.month - 1) - months, 12)
+    m += 1
+    for day in (d.day, 30, 29, 28):
+        try:
+            return date(y, m, day)
+        except ValueError:
+            continue
+    return date(y, m, 28)
+
+
+# ----------------------------
+# Store
+# ----------------------------
+
+def open_history(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def record_snapshot(conn: sqlite3.Connection, rows: Iterable[Dict[str, Any]], run_date: Optional[str] = None) -> int:
+    """Append one snapshot per author for run_date (default: today). Rows use the roster column names
+    (OpenAlexID, Display_name, ORCID, H_index, ...). Rows without an OpenAlex ID or without any metric
+    are skipped so failed lookups don't read as drops to zero. Returns the number of rows written."""
+    run_date = run_date or date.today().isoformat()
+    records = []
+    for r in rows:
+        aid = short_id(r.get("OpenAlexID"))
+        metrics = [_as_int(r.get(col)) for col in METRIC_COLUMNS]
+        if not aid or all(v is None for v in metrics):
+            continue
+        records.append((aid, run_date, r.get("Display_name"), r.get("ORCID"), *metrics))
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO metrics_history
+                (author_id, run_date, display_name, orcid, h_index, i10_index, works_count, total_citations)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (author_id, run_date) DO UPDATE SET
+                display_name = excluded.display_name,
+                orcid = excluded.orcid,
+                h_index = excluded.h_index,
+                i10_index = excluded.i10_index,
+                works_count = excluded.works_count,
+                total_citations = excluded.total_citations
+            """,
+            records,
+        )
+    return len(records)
+
+
+def import_history_json(conn: sqlite3.Connection, path: str) -> int:
+    """Load an export_history_json() file back into the store (change points only; ORCIDs are not
+    exported). Existing (author, run date) rows are kept. Returns the number of rows inserted."""
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    dates = payload.get("dates") or []
+    fields = payload.get("fields") or []
+    cols = [METRIC_COLUMNS[f] for f in fields]
+    records = []
+    for aid, entry in (payload.get("authors") or {}).items():
+        for r in entry.get("rows") or []:
+            records.append((aid, dates[r[0]], entry.get("name"), *(_as_int(v) for v in r[1:1 + len(cols)])))
+    with conn:
+        before = conn.total_changes
+        conn.executemany(
+            f"""
+            INSERT OR IGNORE INTO metrics_history (author_id, run_date, display_name, {', '.join(cols)})
+            VALUES (?, ?, ?{', ?' * len(cols)})
+            """,
+            records,
+        )
+        return conn.total_changes - before
+
+
+def previous_run_date(conn: sqlite3.Connection, before: str) -> Optional[str]:
+    row = conn.execute("SELECT MAX(run_date) FROM metrics_history WHERE run_date < ?", (before,)).fetchone()
+    return row[0] if row else None
+
+
+# ----------------------------
+# Queries
+# ----------------------------
+
+def deltas_since(conn: sqlite3.Connection, since: str) -> List[Dict[str, Any]]:
+    """Per-author change between the baseline snapshot and the latest one.
+
+    The baseline is the author's last snapshot on or before `since`; authors first seen after `since`
+    use their earliest snapshot. Returns dicts with author_id, display_name, from_date, to_date, and
+    <Metric>, <Metric>_delta for every metric in METRIC_COLUMNS.
+    """
+    cols = list(METRIC_COLUMNS.values())
+    delta_sql = ",\n".join(
+        f"cur.{c} AS {c}, cur.{c} - base.{c} AS {c}_delta" for c in cols
+    )
+    sql = f"""
+        WITH bounds AS (
+            SELECT author_id,
+                   MAX(run_date) AS to_date,
+                   COALESCE(MAX(CASE WHEN run_date <= :since THEN run_date END), MIN(run_date)) AS from_date
+            FROM metrics_history
+            GROUP BY author_id
+        )
+        SELECT b.author_id, cur.display_name, b.from_date, b.to_date,
+               {delta_sql}
+        FROM bounds b
+        JOIN metrics_history base ON base.author_id = b.author_id AND base.run_date = b.from_date
+        JOIN metrics_history cur  ON cur.author_id  = b.author_id AND cur.run_date  = b.to_date
+        ORDER BY b.author_id
+    """
+    out = []
+    for row in conn.execute(sql, {"since": since}):
+        rec: Dict[str, Any] = {
+            "author_id": row["author_id"],
+            "display_name": row["display_name"],
+            "from_date": row["from_date"],
+            "to_date": row["to_date"],
+        }
+        for csv_col, col in METRIC_COLUMNS.items():
+            rec[csv_col] = row[col]
+            rec[f"{csv_col}_delta"] = row[f"{col}_delta"]
+        out.append(rec)
+    return out
+
+
+def growth(conn: sqlite3.Connection, months: int, as_of: Optional[date] = None) -> List[Dict[str, Any]]:
+    """deltas_since(as_of - months) plus <Metric>_growth_pct (None when the baseline is 0/NULL)."""
+    since = months_ago(as_of or date.today(), months).isoformat()
+    rows = deltas_since(conn, since)
+    for rec in rows:
+        for csv_col in METRIC_COLUMNS:
+            cur, delta = rec[csv_col], rec[f"{csv_col}_delta"]
+            base = None if cur is None or delta is None else cur - delta
+            rec[f"{csv_col}_growth_pct"] = round(100.0 * delta / base, 2) if base else None
+    return rows
+
+
+def export_history_json(conn: sqlite3.Connection, path: str) -> str:
+    """Write the whole history as one compact JSON file for the dashboard (change points only)."""
+    cols = list(METRIC_COLUMNS.values())
+    authors: Dict[str, Dict[str, Any]] = {}
+    seen_dates = set()
+    last: Dict[str, tuple] = {}
+
+    cur = conn.execute(
+        f"SELECT author_id, run_date, display_name, {', '.join(cols)} FROM metrics_history ORDER BY author_id, run_date"
+    )
+    for row in cur:
+        aid, run_date = row["author_id"], row["run_date"]
+        values = tuple(row[c] for c in cols)
+        entry = authors.setdefault(aid, {"name": row["display_name"], "rows": []})
+        entry["name"] = row["display_name"] or entry["name"]
+        if last.get(aid) == values:
+            continue
+        last[aid] = values
+        seen_dates.add(run_date)
+        entry["rows"].append([run_date, *values])
+
+    # Dates are referenced by index to keep the file small
+    dates = sorted(seen_dates)
+    date_idx = {d: i for i, d in enumerate(dates)}
+    for entry in authors.values():
+        for r in entry["rows"]:
+            r[0] = date_idx[r[0]]
+
+    payload = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "dates": dates,
+        # Last run in the store; change-point series carry their final values forward to here
+        "latest": conn.execute("SELECT MAX(run_date) FROM metrics_history").fetchone()[0],
+        "fields": list(METRIC_COLUMNS),
+        "authors": authors,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"), ensure_ascii=False)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,125 @@
+"""
+Shared OpenAlex HTTP client: one keep-alive session, one rate limiter and one response cache for
+every stage of a run (ID resolution, metrics, works crawl), safe to use from worker threads.
+
+OpenAlexClient.get() is call-compatible with requests.Session.get, so the existing fetch helpers
+(metrics.fetch_author / fetch_by_orcid / resolve_missing_ids, works.fetch_author_works_raw) take it
+wherever they take a session and keep their own retry policies.
+
+- RateLimiter spaces requests to at most OPENALEX_MAX_RPS per second across all threads (OpenAlex
+  allows 10/s in the polite pool). A 429 pauses every thread for Retry-After (or 1 s), not just the
+  one that hit it, so parallel stages back off together.
+- Successful responses for URLs under CACHE_PREFIXES (author lookups) are cached for the lifetime
+  of the client, so resolving a missing ORCID and then fetching that author's metrics, or duplicate
+  roster rows, cost one request.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import requests
+
+MAILTO = os.getenv("OPENALEX_MAILTO", "jdebuck@ucalgary.ca")
+MAX_RPS = float(os.getenv("OPENALEX_MAX_RPS", "8"))
+CACHE_PREFIXES = ("https://api.openalex.org/authors/",)
+
+
+class RateLimiter:
+    """Thread-safe pacing: at most `rate` acquisitions per second, evenly spaced."""
+
+    def __init__(self, rate: float = MAX_RPS):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for `seconds` from now (e.g. after a 429)."""
+        with self._lock:
+            self._next = max(self._next, time.monotonic() + seconds)
+
+
+def _retry_after(resp: requests.Response, default: float = 1.0) -> float:
+    try:
+        return max(float(resp.headers.get("Retry-After", default)), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class OpenAlexClient:
+    """Rate-limited, caching drop-in for requests.Session.get, shared by all stages of a run."""
+
+    def __init__(
+        self,
+        *,
+        email: Optional[str] = None,
+        max_rps: float = MAX_RPS,
+        pool_size: int = 8,
+        cache_prefixes: Iterable[str] = CACHE_PREFIXES,
+    ):
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=max(pool_size, 2))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "User-Agent": f"WCVM_VetMic-ETL (mailto:{email or MAILTO})",
+            "Accept": "application/json",
+        })
+        self.limiter = RateLimiter(max_rps)
+        self.cache_prefixes = tuple(cache_prefixes)
+        self._cache: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], requests.Response] = {}
+        self._cache_lock = threading.Lock()
+        self.stats = {"requests": 0, "cache_hits": 0, "throttled": 0}
+
+    @property
+    def headers(self):
+        return self.session.headers
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+        """requests.Session.get with shared pacing and caching. Raises requests.RequestException
+        like a session would; retrying is left to the caller."""
+        cacheable = url.startswith(self.cache_prefixes)
+        key = (url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())))
+        if cacheable:
+            with self._cache_lock:
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self.stats["cache_hits"] += 1
+            if hit is not None:
+                return hit
+
+        self.limiter.acquire()
+        kwargs.setdefault("timeout", 30)
+        resp = self.session.get(url, params=params, **kwargs)
+        with self._cache_lock:
+            self.stats["requests"] += 1
+            if resp.status_code == 429:
+                self.stats["throttled"] += 1
+            elif cacheable and resp.status_code == 200:
+                self._cache[key] = resp
+        if resp.status_code == 429:
+            wait = _retry_after(resp)
+            logging.debug("OpenAlex 429 on %s; pausing all requests for %.1fs", url, wait)
+            self.limiter.pause(wait)
+        return resp
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> OpenAlexClient:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
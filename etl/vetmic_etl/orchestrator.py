@@ -0,0 +1,175 @@
+"""
+One-process nightly ETL: metrics and works harvest as a small DAG of stages over one shared
+OpenAlex client (vetmic_etl.openalex: keep-alive session, rate limiter, author cache).
+
+Stages
+------
+    read roster ─> per author: lookup (OpenAlex ID, else ORCID) ─┬─> metrics row ───> history + roster_with_metrics.csv
+                                                                 └─> works crawl ───> works DB upsert
+                                                                                  └─> store append (roster order) ─> views ─> co-author graph ─> bundle
+
+The lookup is the metrics request itself: it returns the author's canonical OpenAlex ID, and that
+author's works crawl is submitted the moment it lands instead of after every metrics call has
+finished. Lookups and crawls run on separate thread pools so crawls never queue behind the
+remaining lookups; the shared rate limiter keeps the combined request rate polite.
+roster_with_metrics.csv (and the metrics history) is written as soon as the last lookup lands,
+while crawls are still running. Store appends and database upserts happen on the calling thread
+and the store is written in roster order, so given the same API responses the outputs match
+running fetch_author_metrics.py and then WCVM_VetMic_works.py.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from vetmic_etl import bundle, metrics, works, works_db, works_store
+from vetmic_etl.openalex import OpenAlexClient
+
+WORKERS = int(os.getenv("ETL_WORKERS", "4"))
+LOOKUP_WORKERS = 2
+
+
+def run_etl(
+    roster_path: str,
+    metrics_out: str,
+    works_out: str,
+    *,
+    email: Optional[str] = None,
+    log_diffs: bool = False,
+    history_db: Optional[str] = None,
+    history_json: Optional[str] = None,
+    record_history: bool = True,
+    views: Union[str, Dict[str, Optional[int]]] = works_store.DEFAULT_VIEWS,
+    works_db_path: Union[str, bool, None] = True,
+    workers: int = WORKERS,
+    client: Optional[OpenAlexClient] = None,
+    publish: bool = True,
+) -> Dict[str, Any]:
+    """Metrics for the roster at roster_path (written to metrics_out, see metrics.write_metrics) and
+    the works harvest into works_out's directory (see works.harvest), run concurrently.
+
+    Raises metrics.MissingIdColumnError when the roster has no ID column and works.HarvestError
+    when no author has primary-view works; roster_with_metrics is written before the latter.
+    With publish=True the run ends by refreshing the dashboard bundle (vetmic_etl.bundle), also when
+    it raises after the outputs were reset, so the bundle never lags the plain files.
+    Returns {"metrics": merged roster DataFrame, "works": harvest summary, "http": client stats,
+    "bundle": manifest or None}.
+    """
+    email = metrics.contact_email(email)
+    own_client = client is None
+    client = client or OpenAlexClient(email=email, pool_size=workers + LOOKUP_WORKERS)
+
+    df = metrics.read_input(roster_path)
+    openalex_col, orcid_col = metrics.id_columns(df)
+    names = {idx: name for idx, name, _ in works.roster_authors(df, openalex_col)}
+    rows = list(df.iterrows())
+
+    plan = works.plan_outputs(works_out, views, works_db_path)
+    works.reset_outputs(plan)
+    db = works_db.open_works_db(plan["works_db"]) if plan["works_db"] else None
+
+    out_rows: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    authors: List[Tuple[Any, str, str]] = [(idx, names[idx], "") for idx, _ in rows]
+    frames_by_pos: Dict[int, Any] = {}  # crawled frames waiting for their turn in roster order
+    next_pos = 0
+    processed = 0
+    skipped_missing_id = 0
+
+    def lookup(pos: int) -> Dict[str, Any]:
+        row = rows[pos][1]
+        return metrics.fetch_author_row(row.get(openalex_col), row.get(orcid_col), client, email=email)
+
+    def crawl(pos: int) -> Tuple[List[Dict[str, Any]], Any]:
+        return works.crawl_author(authors[pos][2], client)
+
+    merged = None
+
+    def write_metrics() -> Any:
+        return metrics.write_metrics(
+            df, out_rows, openalex_col, orcid_col, metrics_out,
+            log_diffs=log_diffs, history_db=history_db, history_json=history_json, record=record_history,
+        )
+
+    def flush() -> None:
+        """Append crawled frames to the store in roster order, as far as they are available."""
+        nonlocal next_pos, processed
+        while next_pos in frames_by_pos:
+            df_all = frames_by_pos.pop(next_pos)
+            if df_all is not None and works.store_author_works(plan, df_all, authors[next_pos][1]):
+                processed += 1
+            next_pos += 1
+
+    manifest = None
+    try:
+        with ThreadPoolExecutor(LOOKUP_WORKERS, thread_name_prefix="lookup") as lookup_pool, \
+                ThreadPoolExecutor(max(workers, 1), thread_name_prefix="crawl") as crawl_pool:
+            lookups: Dict[Future, int] = {lookup_pool.submit(lookup, pos): pos for pos in range(len(rows))}
+            crawls: Dict[Future, int] = {}
+            pending: Set[Future] = set(lookups)
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut in lookups:
+                        pos = lookups.pop(fut)
+                        idx, row = rows[pos]
+                        try:
+                            out_rows[pos] = fut.result()
+                        except Exception:
+                            logging.exception(f"Lookup failed for {names[idx]}")
+                            out_rows[pos] = metrics.empty_metrics_row(row.get(openalex_col), row.get(orcid_col))
+                        author_id = metrics.cell_text(out_rows[pos]["OpenAlexID"]) or metrics.cell_text(row.get(openalex_col))
+                        authors[pos] = (idx, names[idx], author_id)
+                        if not author_id:
+                            skipped_missing_id += 1
+                            logging.info(f"Skipping row {idx} — missing OpenAlexID")
+                            frames_by_pos[pos] = None
+                            continue
+                        logging.info(f"Processing {names[idx]} ({author_id})")
+                        cf = crawl_pool.submit(crawl, pos)
+                        crawls[cf] = pos
+                        pending.add(cf)
+                    else:
+                        pos = crawls.pop(fut)
+                        idx, name, author_id = authors[pos]
+                        try:
+                            works_raw, df_all = fut.result()
+                        except Exception:
+                            logging.exception(f"Error fetching works for {name} ({author_id})")
+                            frames_by_pos[pos] = None
+                            continue
+                        works.upsert_author_works(db, plan, works_raw, name, author_id)
+                        frames_by_pos[pos] = df_all
+                if not lookups and merged is None:
+                    merged = write_metrics()  # every author looked up; crawls may still be running
+                flush()
+
+        logging.info(
+            "HTTP: %(requests)d requests, %(cache_hits)d cache hits, %(throttled)d throttled",
+            client.stats, extra={"event": "http_stats", **client.stats},
+        )
+
+        if merged is None:  # empty roster
+            merged = write_metrics()
+        summary = works.finish_harvest(plan, authors, processed, skipped_missing_id)
+    finally:
+        if db is not None:
+            db.close()
+        if own_client:
+            client.close()
+        # Also when a stage raises: the outputs were reset or rewritten at that point, and the
+        # dashboard prefers the bundle, so it must mirror whatever is on disk now
+        if publish:
+            manifest = bundle.publish_bundle(
+                plan["output_dir"],
+                dict(
+                    bundle.ARTIFACTS,
+                    roster=os.path.abspath(metrics_out),
+                    pubs=os.path.abspath(plan["output_dedup"]),
+                    metrics_history=os.path.abspath(metrics.history_paths(metrics_out, history_db, history_json)[1]),
+                ),
+            )
+    return {"metrics": merged, "works": summary, "http": dict(client.stats), "bundle": manifest}
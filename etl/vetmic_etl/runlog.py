@@ -0,0 +1,201 @@
+"""
+Run logging shared by the ETL scripts.
+
+Each run produces:
+- <run_name>_<stamp>.jsonl           compact JSON-lines events (INFO and above); small enough to commit.
+- <run_name>_<stamp>.detail.log.gz   gzip-compressed DEBUG detail (per-page fetches, urllib3 connections).
+- console output in the usual "[time] LEVEL: message" form so GitHub Actions shows progress.
+
+All handlers sit behind a QueueHandler: the fetch loops only enqueue records and a background
+QueueListener thread does the formatting, compression and file I/O.
+
+Retention
+---------
+Before a run starts, old files in the log directory are pruned by age (ETL_LOG_RETENTION_DAYS,
+default 30) and then by a total size cap (ETL_LOG_MAX_BYTES, default 5 MB), oldest first.
+Zero-byte files and legacy plain-text *.log files are covered by the same rules.
+"""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+RETENTION_DAYS = int(os.getenv("ETL_LOG_RETENTION_DAYS", "30"))
+MAX_TOTAL_BYTES = int(os.getenv("ETL_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+
+EVENTS_SUFFIX = ".jsonl"
+DETAIL_SUFFIX = ".detail.log.gz"
+LEGACY_SUFFIX = ".log"
+CONSOLE_FORMAT = "[%(asctime)s] %(levelname)s: %(message)s"
+DETAIL_FORMAT = "[%(asctime)s] %(levelname)s %(name)s: %(message)s"
+
+_STAMP_RE = re.compile(r"_(\d{8}_\d{6})(?:\.|$)")
+# Attributes every LogRecord has; anything else came in through `extra=` and is emitted as a field.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record: ts, level, logger, msg, plus any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, val in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                event[key] = val
+        return json.dumps(event, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class GzipFileHandler(logging.StreamHandler):
+    """Writes records straight into a gzip text stream; the file is only complete after close()."""
+
+    def __init__(self, path: str, compresslevel: int = 6) -> None:
+        super().__init__(gzip.open(path, "at", encoding="utf-8", compresslevel=compresslevel))
+        self.path = path
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if self.stream is not None:
+                try:
+                    self.stream.flush()
+                    self.stream.close()
+                finally:
+                    self.stream = None
+        finally:
+            self.release()
+        super().close()
+
+
+# ----------------------------
+# Retention
+# ----------------------------
+
+def _file_stamp(path: str) -> datetime:
+    """Run timestamp from a name like etl_run_20250907_153155.log; falls back to mtime."""
+    m = _STAMP_RE.search(os.path.basename(path))
+    if m:
+        try:
+            return datetime.strptime(m.group(1), "%Y%m%d_%H%M%S")
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def prune_logs(log_dir: str, retention_days: int = RETENTION_DAYS, max_total_bytes: int = MAX_TOTAL_BYTES) -> List[str]:
+    """Delete empty, expired and over-cap log files in log_dir. Returns the removed paths."""
+    if not os.path.isdir(log_dir):
+        return []
+
+    entries: List[Tuple[datetime, int, str]] = []
+    for name in os.listdir(log_dir):
+        if not name.endswith((EVENTS_SUFFIX, DETAIL_SUFFIX, LEGACY_SUFFIX)):
+            continue
+        path = os.path.join(log_dir, name)
+        if os.path.isfile(path):
+            entries.append((_file_stamp(path), os.path.getsize(path), path))
+
+    cutoff = datetime.now() - timedelta(days=retention_days) if retention_days > 0 else None
+    removed: List[str] = []
+    kept_bytes = 0
+    # Newest first, so the size cap drops the oldest runs
+    for stamp, size, path in sorted(entries, reverse=True):
+        expired = cutoff is not None and stamp < cutoff
+        over_cap = max_total_bytes > 0 and kept_bytes + size > max_total_bytes
+        if size == 0 or expired or over_cap:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError:
+                pass
+            continue
+        kept_bytes += size
+    return removed
+
+
+# ----------------------------
+# Setup
+# ----------------------------
+
+def setup_run_logging(
+    run_name: str,
+    log_dir: str,
+    *,
+    console_level: int = logging.INFO,
+    retention_days: int = RETENTION_DAYS,
+    max_total_bytes: int = MAX_TOTAL_BYTES,
+) -> Dict[str, str]:
+    """Route the root logger through a queue to events/detail/console handlers.
+
+    Safe to call more than once per process: a previous listener is stopped and replaced.
+    Returns {"events": path, "detail": path}.
+    """
+    global _listener
+
+    os.makedirs(log_dir, exist_ok=True)
+    removed = prune_logs(log_dir, retention_days, max_total_bytes)
+
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    events_path = os.path.join(log_dir, f"{run_name}_{stamp}{EVENTS_SUFFIX}")
+    detail_path = os.path.join(log_dir, f"{run_name}_{stamp}{DETAIL_SUFFIX}")
+
+    events = logging.FileHandler(events_path, encoding="utf-8", delay=True)
+    events.setLevel(logging.INFO)
+    events.setFormatter(JsonLinesFormatter())
+
+    detail = GzipFileHandler(detail_path)
+    detail.setLevel(logging.DEBUG)
+    detail.setFormatter(logging.Formatter(DETAIL_FORMAT))
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    stop_run_logging()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+        h.close()
+    root.setLevel(logging.DEBUG)
+    root.addHandler(logging.handlers.QueueHandler(queue.SimpleQueue()))
+
+    _listener = logging.handlers.QueueListener(
+        root.handlers[0].queue, events, detail, console, respect_handler_level=True
+    )
+    _listener.start()
+
+    logging.info(
+        "Logging to %s (detail: %s)", events_path, detail_path,
+        extra={"event": "log_start", "run": run_name, "pruned": len(removed)},
+    )
+    return {"events": events_path, "detail": detail_path}
+
+
+def stop_run_logging() -> None:
+    """Drain the queue and close the file handlers (also registered with atexit)."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for h in _listener.handlers:
+        h.close()
+    _listener = None
+
+
+atexit.register(stop_run_logging)
@@ -0,0 +1,522 @@
+"""
+OpenAlex works harvest for the roster (library side of etl/WCVM_VetMic_works.py).
+
+- Fetches all works for each roster author via OpenAlex (cursor pagination), with retries/backoff
+  and a proper User-Agent header, over one reusable requests.Session.
+- Flattens nested JSON with sep="__" so columns match expected keys and adds the convenience string
+  columns authors, institutions, concepts_list.
+- Appends every author's lifetime works, tagged with the author, to the canonical works store and
+  derives the reporting-window views from it (vetmic_etl.works_store), upserts the raw records into
+  the works database (vetmic_etl.works_db) and builds the co-author graph (vetmic_etl.coauthor_graph).
+
+Usage
+-----
+    from vetmic_etl import harvest
+    summary = harvest("data/roster_with_metrics.csv", "data/openalex_all_authors_last5y_key_fields_dedup.csv")
+
+Nothing here parses arguments or configures logging; the CLI does that. Failures raise instead of
+exiting (HarvestError when the run produced nothing usable).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+import requests
+
+from vetmic_etl import coauthor_graph, frames, works_db, works_store
+
+# ----------------------------
+# Config
+# ----------------------------
+MAILTO = os.getenv("OPENALEX_MAILTO", "jdebuck@ucalgary.ca")
+BASE_URL = "https://api.openalex.org/works"
+PER_PAGE = int(os.getenv("OPENALEX_PER_PAGE", "200"))
+MAX_RETRIES = int(os.getenv("OPENALEX_MAX_RETRIES", "6"))
+BACKOFF_BASE = float(os.getenv("OPENALEX_BACKOFF_BASE", "1.6"))
+TIMEOUT = int(os.getenv("OPENALEX_TIMEOUT", "30"))
+RETRIABLE_STATUS = {429, 500, 502, 503, 504}
+HEADERS = {
+    "User-Agent": f"WCVM_VetMic-ETL (mailto:{MAILTO})",
+    "Accept": "application/json",
+}
+WORKS_DB_FILENAME = "openalex_works.sqlite"
+
+# Key fields expected downstream / in dashboard
+KEY_FIELDS_FOR_OUTPUT = [
+    "id", "doi", "display_name", "publication_year", "type", "cited_by_count",
+    "open_access__oa_status", "host_venue__display_name", "primary_location__source__display_name",
+    "primary_topic__display_name", "primary_topic__field__display_name", "primary_topic__subfield__display_name",
+    "biblio__volume", "biblio__issue", "biblio__first_page", "biblio__last_page", "fwci",
+    "authors", "institutions", "concepts_list"
+]
+KEY_FIELDS_FOR_OUTPUT_WITH_TAGS = KEY_FIELDS_FOR_OUTPUT + ["author_name", "author_openalex_id"]
+
+
+class HarvestError(RuntimeError):
+    """The harvest ran but produced no usable output (CI should flag the run)."""
+
+
+# ----------------------------
+# Helpers
+# ----------------------------
+
+def _ensure_openalex_uri(author_id: str) -> str:
+    """Accepts 'A##########' or full 'https://openalex.org/A##########' and returns full URI."""
+    if not isinstance(author_id, str):
+        return ""
+    aid = author_id.strip()
+    if not aid:
+        return ""
+    if aid.startswith("http://") or aid.startswith("https://"):
+        return aid
+    return f"https://openalex.org/{aid}"
+
+
+def safe_join(items: Iterable[str], sep: str = "; ") -> str:
+    return sep.join(sorted({(x or "").strip() for x in items if (x or "").strip()}))
+
+
+def extract_string_lists_from_row(row: pd.Series) -> Tuple[str, str, str]:
+    """Builds authors, institutions, concepts_list strings from still-nested list fields if present.
+
+    After json_normalize(sep="__"), list-of-dicts fields (like authorships, concepts) remain Python lists.
+    We parse those lists here.
+    """
+    # Authors
+    authors_joined = ""
+    if "authorships" in row and isinstance(row["authorships"], list):
+        author_names: List[str] = []
+        for a in row["authorships"]:
+            try:
+                nm = a.get("author", {}).get("display_name", "")
+                if nm:
+                    author_names.append(nm)
+            except Exception:
+                continue
+        authors_joined = safe_join(author_names)
+
+    # Institutions
+    inst_joined = ""
+    if "authorships" in row and isinstance(row["authorships"], list):
+        inst_names: List[str] = []
+        for a in row["authorships"]:
+            try:
+                insts = a.get("institutions", []) or []
+                for inst in insts:
+                    nm = inst.get("display_name", "")
+                    if nm:
+                        inst_names.append(nm)
+            except Exception:
+                continue
+        inst_joined = safe_join(inst_names)
+
+    # Concepts
+    concepts_joined = ""
+    if "concepts" in row and isinstance(row["concepts"], list):
+        concept_names: List[str] = []
+        for c in row["concepts"]:
+            try:
+                nm = c.get("display_name", "")
+                if nm:
+                    concept_names.append(nm)
+            except Exception:
+                continue
+        concepts_joined = safe_join(concept_names)
+
+    return authors_joined, inst_joined, concepts_joined
+
+
+def add_convenience_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds/derives authors, institutions, concepts_list, and ensures fwci column exists."""
+    if df.empty:
+        return df
+
+    # Ensure fwci column exists (OpenAlex doesn't provide FWCI; keep as NaN unless provided upstream)
+    if "fwci" not in df.columns:
+        df["fwci"] = pd.NA
+
+    # Build string-joined convenience columns from nested lists per row
+    if any(col in df.columns for col in ("authorships", "concepts")):
+        vals = df.apply(extract_string_lists_from_row, axis=1, result_type="expand")
+        # vals has 3 columns if not empty
+        if not vals.empty:
+            df["authors"] = vals[0]
+            df["institutions"] = vals[1]
+            df["concepts_list"] = vals[2]
+
+    # Ensure the explicit convenience columns exist even if lists were absent
+    for col in ("authors", "institutions", "concepts_list"):
+        if col not in df.columns:
+            df[col] = ""
+
+    return df
+
+
+def append_df_to_csv(df: pd.DataFrame, path: str, fixed_cols: Optional[List[str]] = None) -> None:
+    """Append rows using a *fixed schema* so the compiled CSV always has the same
+    number/order of columns. This avoids downstream tokenizing errors when
+    reading the compiled CSV back (mismatched header vs. rows).
+    """
+    if df.empty:
+        logging.info(f"append_df_to_csv: nothing to write to {path} (empty df).")
+        return
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Enforce a stable schema: add any missing fixed columns as empty, then reorder exactly
+    if fixed_cols:
+        for col in fixed_cols:
+            if col not in df.columns:
+                df[col] = pd.NA
+        df = df[fixed_cols]
+
+    write_header = not os.path.exists(path)
+    df.to_csv(path, index=False, header=write_header, mode=("w" if write_header else "a"))
+
+
+# ----------------------------
+# Roster
+# ----------------------------
+
+def read_roster(path: str) -> pd.DataFrame:
+    logging.info(f"Reading roster from {path}")
+    return pd.read_csv(path)
+
+
+def roster_authors(roster: pd.DataFrame, id_col: str = "OpenAlexID") -> List[Tuple[Any, str, str]]:
+    """(row index, display name, OpenAlex ID) per roster row; the ID is "" when missing."""
+    out: List[Tuple[Any, str, str]] = []
+    for idx, row in roster.iterrows():
+        author_id = row.get(id_col)
+        if author_id is None or (isinstance(author_id, float) and author_id != author_id):
+            author_id = ""
+        name = row.get("Name") or row.get("Author") or row.get("FullName") or ""
+        if not isinstance(name, str) or not name.strip():
+            name = str(author_id or "").strip() or "Unknown"
+        out.append((idx, name, str(author_id or "").strip()))
+    return out
+
+
+# ----------------------------
+# OpenAlex fetch (cursor pagination + backoff)
+# ----------------------------
+
+def build_session() -> requests.Session:
+    """Keep-alive session with the ETL's User-Agent; reuse it across authors."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    return session
+
+
+def fetch_author_works_raw(full_author_id: str, session: Optional[requests.Session] = None) -> List[Dict[str, Any]]:
+    """Fetch all works (raw OpenAlex JSON) for an author using cursor pagination.
+    Does NOT throw on HTTP errors; logs instead and returns what was fetched so far."""
+    author_uri = _ensure_openalex_uri(full_author_id)
+    if not author_uri:
+        logging.warning("fetch_author_works_raw: empty/invalid author id")
+        return []
+
+    http = session or requests
+    # A passed-in session/OpenAlexClient already carries the run's User-Agent (with the --email mailto)
+    headers = None if session is not None else HEADERS
+    params = {
+        "filter": f"author.id:{author_uri}",
+        "per-page": PER_PAGE,
+        "cursor": "*",
+    }
+
+    works_all: List[Dict[str, Any]] = []
+    retries = 0
+
+    logging.info(f"OpenAlex fetch for {author_uri}")
+
+    while True:
+        try:
+            resp = http.get(BASE_URL, params=params, headers=headers, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            logging.exception(f"OpenAlex request exception: {e}")
+            break
+
+        if resp.status_code in RETRIABLE_STATUS:
+            delay = BACKOFF_BASE ** retries
+            logging.warning(
+                f"OpenAlex {resp.status_code} at cursor {params.get('cursor')!r}; retry {retries+1}/{MAX_RETRIES} in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            retries += 1
+            if retries > MAX_RETRIES:
+                logging.error("Max retries exceeded; aborting fetch for this author.")
+                break
+            continue
+
+        try:
+            resp.raise_for_status()
+        except requests.HTTPError as e:
+            logging.exception(f"HTTP error from OpenAlex: {e}")
+            break
+
+        data = resp.json()
+        results = data.get("results", [])
+        logging.debug("Fetched %d results at cursor %r", len(results), params.get("cursor"))
+        if not results:
+            break
+
+        works_all.extend(results)
+        next_cursor = data.get("meta", {}).get("next_cursor")
+        if not next_cursor:
+            break
+
+        params["cursor"] = next_cursor
+        retries = 0  # reset after success
+
+    if not works_all:
+        logging.info("No works returned from OpenAlex for this author.")
+    return works_all
+
+
+def works_to_frame(works_all: List[Dict[str, Any]], full_author_id: str) -> pd.DataFrame:
+    """Flatten raw works with sep="__", add convenience columns and author tags, and project to
+    KEY_FIELDS_FOR_OUTPUT_WITH_TAGS with compact dtypes (see vetmic_etl/frames.py)."""
+    author_uri = _ensure_openalex_uri(full_author_id)
+    if not works_all or not author_uri:
+        return pd.DataFrame()
+
+    # Flatten nested JSON into columns using the __ separator
+    df_all = pd.json_normalize(works_all, sep="__")
+    if "publication_year" in df_all.columns:
+        df_all["publication_year"] = pd.to_numeric(df_all["publication_year"], errors="coerce")
+
+    # Add convenience columns (authors, institutions, concepts_list, fwci placeholder)
+    df_all = add_convenience_columns(df_all)
+
+    # Tag with author for downstream grouping
+    df_all["author_name"] = author_uri.rsplit("/", 1)[-1]
+    df_all["author_openalex_id"] = author_uri
+
+    # Optional visibility for schema drift
+    missing = [c for c in KEY_FIELDS_FOR_OUTPUT_WITH_TAGS if c not in df_all.columns]
+    if missing:
+        logging.debug(f"Flattened df_all missing expected columns: {missing}")
+        for col in missing:
+            df_all[col] = pd.NA
+
+    # Keep only the output schema (drops the wide nested/flattened JSON) in compact dtypes
+    return frames.compact_frame(df_all[KEY_FIELDS_FOR_OUTPUT_WITH_TAGS].copy())
+
+
+def fetch_author_works(full_author_id: str, session: Optional[requests.Session] = None) -> pd.DataFrame:
+    """Fetch all works for an author and return them flattened and author-tagged."""
+    return works_to_frame(fetch_author_works_raw(full_author_id, session), full_author_id)
+
+
+# ----------------------------
+# Harvest
+# ----------------------------
+
+def plan_outputs(
+    output_dedup: str,
+    views: Union[str, Dict[str, Optional[int]]] = works_store.DEFAULT_VIEWS,
+    works_db_path: Union[str, bool, None] = True,
+) -> Dict[str, Any]:
+    """Resolve every output location of a harvest from the primary dedup path (see harvest())."""
+    output_dir = os.path.dirname(output_dedup) or "data"
+    view_years = works_store.parse_views(views) if isinstance(views, str) else dict(views)
+    view_years.setdefault(works_store.PRIMARY_VIEW, 5)  # output_dedup always receives the last5y dedup
+    if works_db_path is True:
+        works_db_path = os.path.join(output_dir, WORKS_DB_FILENAME)
+    return {
+        "output_dir": output_dir,
+        "output_dedup": output_dedup,
+        "view_years": view_years,
+        "store": os.path.join(output_dir, works_store.STORE_FILENAME),
+        "works_db": works_db_path or None,
+        "primary_min_year": datetime.now().year - view_years[works_store.PRIMARY_VIEW] + 1,
+    }
+
+
+def reset_outputs(plan: Dict[str, Any]) -> None:
+    """Start fresh each run to avoid legacy headers/rows mismatch from previous runs."""
+    os.makedirs(plan["output_dir"], exist_ok=True)
+    stale = [plan["store"], plan["output_dedup"]]
+    for view in plan["view_years"]:
+        stale.extend(works_store.view_paths(plan["output_dir"], view).values())
+    for p in dict.fromkeys(stale):
+        try:
+            os.remove(p)
+            logging.info(f"Removed old artifact: {p}")
+        except FileNotFoundError:
+            pass
+
+
+def crawl_author(author_id: str, session: Optional[requests.Session] = None) -> Tuple[List[Dict[str, Any]], pd.DataFrame]:
+    """(raw works, projected frame) for one author. Safe to run in worker threads."""
+    works_raw = fetch_author_works_raw(author_id, session)
+    return works_raw, works_to_frame(works_raw, author_id)
+
+
+def upsert_author_works(db, plan: Dict[str, Any], works_raw: List[Dict[str, Any]], author_name: str, author_id: str) -> None:
+    """Upsert one author's raw works into the works database (if enabled); never raises."""
+    if db is None or not works_raw:
+        return
+    try:
+        n = works_db.upsert_works(db, works_raw)
+        logging.debug("Upserted %d works for %s into %s", n, author_name, plan["works_db"])
+    except Exception:
+        logging.exception(f"Works DB upsert failed for {author_name} ({author_id})")
+
+
+def store_author_works(plan: Dict[str, Any], df_all: pd.DataFrame, author_name: str) -> bool:
+    """Append one author's works to the store. True when the author has primary-view (last5y) works."""
+    if df_all.empty:
+        logging.info(f"No lifetime works for {author_name}")
+        return False
+    append_df_to_csv(df_all, plan["store"], fixed_cols=KEY_FIELDS_FOR_OUTPUT_WITH_TAGS)
+    logging.info(f"Appended {len(df_all)} lifetime works for {author_name}")
+    if "publication_year" in df_all.columns and (df_all["publication_year"] >= plan["primary_min_year"]).any():
+        return True
+    logging.info(f"No last-5y works for {author_name}")
+    return False
+
+
+def finish_harvest(
+    plan: Dict[str, Any],
+    authors: List[Tuple[Any, str, str]],
+    processed: int,
+    skipped_missing_id: int,
+) -> Dict[str, Any]:
+    """Views + co-author graph from the filled store; raises HarvestError if nothing was processed.
+    Returns {"processed", "skipped_missing_id", "store", "views", "works_db", "graph"}."""
+    logging.info(f"Total skipped rows due to missing ID: {skipped_missing_id}")
+    if plan["works_db"]:
+        logging.info(f"Works database updated: {plan['works_db']}")
+
+    store_path = plan["store"]
+    summary: Dict[str, Any] = {
+        "processed": processed,
+        "skipped_missing_id": skipped_missing_id,
+        "store": store_path,
+        "views": {},
+        "works_db": plan["works_db"],
+        "graph": None,
+    }
+    if os.path.exists(store_path):
+        store = load_store(store_path)  # parsed once for both the views and the graph
+        summary["views"] = build_views(store_path, plan["output_dedup"], plan["view_years"], store)
+        summary["graph"] = build_graph(store_path, plan["output_dir"], summary["views"], authors, store)
+        del store
+    else:
+        logging.warning(f"No works store found at {store_path}; nothing to build views from.")
+
+    if processed == 0:
+        raise HarvestError("No authors processed with last-5y output — failing run so CI flags it.")
+    return summary
+
+
+def harvest(
+    roster: Union[str, pd.DataFrame],
+    output_dedup: str,
+    *,
+    views: Union[str, Dict[str, Optional[int]]] = works_store.DEFAULT_VIEWS,
+    works_db_path: Union[str, bool, None] = True,
+    session: Optional[requests.Session] = None,
+) -> Dict[str, Any]:
+    """Harvest every roster author's works and build all derived artifacts next to `output_dedup`.
+
+    roster         roster CSV path or an already loaded DataFrame (needs an OpenAlexID column)
+    output_dedup   path of the deduplicated primary-view (last5y) CSV; its directory is the output dir
+    views          comma-separated view names or a parsed works_store.parse_views() mapping
+    works_db_path  SQLite works database: True for <output dir>/openalex_works.sqlite, a path, or
+                   False/None to skip it
+    session        requests.Session (or vetmic_etl.openalex.OpenAlexClient) to reuse
+
+    Authors are crawled one after another; vetmic_etl.orchestrator runs the same stages concurrently.
+    Returns the finish_harvest() summary.
+    """
+    plan = plan_outputs(output_dedup, views, works_db_path)
+    reset_outputs(plan)
+
+    if isinstance(roster, str):
+        roster = read_roster(roster)
+    authors = roster_authors(roster)
+    session = session or build_session()
+
+    processed = 0
+    skipped_missing_id = 0
+    db = works_db.open_works_db(plan["works_db"]) if plan["works_db"] else None
+
+    try:
+        for idx, author_name, author_id in authors:
+            if not author_id:
+                skipped_missing_id += 1
+                logging.info(f"Skipping row {idx} — missing OpenAlexID")
+                continue
+
+            logging.info(f"Processing {author_name} ({author_id})")
+            try:
+                works_raw, df_all = crawl_author(author_id, session)
+            except Exception:
+                logging.exception(f"Error fetching works for {author_name} ({author_id})")
+                continue
+
+            upsert_author_works(db, plan, works_raw, author_name, author_id)
+            if store_author_works(plan, df_all, author_name):
+                processed += 1
+    finally:
+        if db is not None:
+            db.close()
+
+    return finish_harvest(plan, authors, processed, skipped_missing_id)
+
+
+def load_store(store_path: str) -> pd.DataFrame:
+    """The works store in compact dtypes; raises HarvestError when it cannot be parsed."""
+    try:
+        return frames.read_compact_csv(store_path)
+    except Exception as e:
+        logging.exception("Reading the works store failed. This usually means a schema mismatch in the store CSV.")
+        raise HarvestError(f"Reading {store_path} failed: {e}") from e
+
+
+def build_views(
+    store_path: str,
+    output_dedup: str,
+    view_years: Dict[str, Optional[int]],
+    store: Optional[pd.DataFrame] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Cut every view from the store; the primary view's dedup goes to output_dedup."""
+    try:
+        view_summary = works_store.materialize_views(
+            store_path, os.path.dirname(output_dedup) or "data", view_years,
+            dedup_overrides={works_store.PRIMARY_VIEW: output_dedup},
+            store=store,
+        )
+    except Exception as e:
+        logging.exception("Building views from the works store failed. This usually means a schema mismatch in the store CSV.")
+        raise HarvestError(f"Building views from {store_path} failed: {e}") from e
+    logging.info(f"Deduplicated file written to {output_dedup}")
+    return view_summary
+
+
+def build_graph(
+    store_path: str,
+    output_dir: str,
+    view_summary: Dict[str, Dict[str, Any]],
+    authors: List[Tuple[Any, str, str]],
+    store: Optional[pd.DataFrame] = None,
+) -> Optional[str]:
+    """Co-author network per view (layout + metrics) for the dashboard; optional, never fails the run."""
+    try:
+        roster_names = {aid: name for _, name, aid in authors if aid}
+        graph_path = os.path.join(output_dir, coauthor_graph.GRAPH_FILENAME)
+        if coauthor_graph.build_coauthor_graph(store_path, roster_names, view_summary, graph_path, store):
+            logging.info(f"Co-author graph written to {graph_path}")
+            return graph_path
+    except Exception:
+        logging.exception("Co-author graph stage failed; dashboard falls back to computing it in the browser")
+    return None
@@ -0,0 +1,257 @@
+"""
+Indexed local works database (SQLite, stdlib only), upserted by the works harvest.
+
+The CSV outputs are flat and meant for the dashboard; this database keeps the relational shape of
+the OpenAlex records so ad hoc questions ("all works by roster member X in 2023 on topic Y") are
+index lookups instead of full scans of a CSV.
+
+Tables
+------
+works(work_id PK, doi, title, publication_year, type, cited_by_count, oa_status, source_name,
+      primary_topic_id, primary_topic, field, subfield, fwci, updated_at)
+authors(author_id PK, display_name, orcid)
+authorships(work_id, author_id, author_position, position_index, is_corresponding)   PK (work_id, author_id)
+institutions(institution_id PK, display_name, ror, country_code, type)
+authorship_institutions(work_id, author_id, institution_id)
+concepts(concept_id PK, display_name, level)
+work_concepts(work_id, concept_id, score)
+
+IDs are stored in short form (W…, A…, I…, C…, T…). Indexes cover author id, publication year,
+topic and work id. Upserting a work replaces its authorship/concept rows, so re-harvesting picks up
+author list corrections from OpenAlex.
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (
+    work_id          TEXT PRIMARY KEY,
+    doi              TEXT,
+    title            TEXT,
+    publication_year INTEGER,
+    type             TEXT,
+    cited_by_count   INTEGER,
+    oa_status        TEXT,
+    source_name      TEXT,
+    primary_topic_id TEXT,
+    primary_topic    TEXT,
+    field            TEXT,
+    subfield         TEXT,
+    fwci             REAL,
+    updated_at       TEXT
+);
+CREATE TABLE IF NOT EXISTS authors (
+    author_id    TEXT PRIMARY KEY,
+    display_name TEXT,
+    orcid        TEXT
+);
+CREATE TABLE IF NOT EXISTS authorships (
+    work_id          TEXT NOT NULL,
+    author_id        TEXT NOT NULL,
+    author_position  TEXT,
+    position_index   INTEGER,
+    is_corresponding INTEGER,
+    PRIMARY KEY (work_id, author_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS institutions (
+    institution_id TEXT PRIMARY KEY,
+    display_name   TEXT,
+    ror            TEXT,
+    country_code   TEXT,
+    type           TEXT
+);
+CREATE TABLE IF NOT EXISTS authorship_institutions (
+    work_id        TEXT NOT NULL,
+    author_id      TEXT NOT NULL,
+    institution_id TEXT NOT NULL,
+    PRIMARY KEY (work_id, author_id, institution_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS concepts (
+    concept_id   TEXT PRIMARY KEY,
+    display_name TEXT,
+    level        INTEGER
+);
+CREATE TABLE IF NOT EXISTS work_concepts (
+    work_id    TEXT NOT NULL,
+    concept_id TEXT NOT NULL,
+    score      REAL,
+    PRIMARY KEY (work_id, concept_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_authorships_author ON authorships (author_id, work_id);
+CREATE INDEX IF NOT EXISTS idx_works_year ON works (publication_year);
+CREATE INDEX IF NOT EXISTS idx_works_topic_id ON works (primary_topic_id, publication_year);
+CREATE INDEX IF NOT EXISTS idx_works_topic ON works (primary_topic COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_works_doi ON works (doi);
+CREATE INDEX IF NOT EXISTS idx_authorship_inst ON authorship_institutions (institution_id);
+CREATE INDEX IF NOT EXISTS idx_work_concepts_concept ON work_concepts (concept_id);
+"""
+
+
+def short_id(value: Any) -> str:
+    """'https://openalex.org/W123' / 'https://api.openalex.org/authors/A123' / 'openalex:a123' -> bare
+    'W123' / 'A123'; bare IDs pass through; None/NaN -> ''."""
+    s = str(value or "").strip().rstrip("/")
+    if not s or s.lower() in {"nan", "none"}:
+        return ""
+    s = s.rsplit("/", 1)[-1]
+    if s.lower().startswith("openalex:"):
+        s = s.split(":", 1)[1]
+    return s[:1].upper() + s[1:]
+
+
+def _get(d: Optional[Dict[str, Any]], *path: str) -> Any:
+    for key in path:
+        if not isinstance(d, dict):
+            return None
+        d = d.get(key)
+    return d
+
+
+def open_works_db(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+# ----------------------------
+# Upsert
+# ----------------------------
+
+def upsert_works(conn: sqlite3.Connection, works: Iterable[Dict[str, Any]]) -> int:
+    """Upsert raw OpenAlex work objects (as returned by /works) in one transaction. Returns the count."""
+    now = datetime.now().isoformat(timespec="seconds")
+    work_rows: List[tuple] = []
+    author_rows: Dict[str, tuple] = {}
+    inst_rows: Dict[str, tuple] = {}
+    concept_rows: Dict[str, tuple] = {}
+    authorship_rows: List[tuple] = []
+    auth_inst_rows: List[tuple] = []
+    work_concept_rows: List[tuple] = []
+
+    for w in works:
+        wid = short_id(w.get("id"))
+        if not wid:
+            continue
+        topic = w.get("primary_topic") or {}
+        work_rows.append((
+            wid,
+            w.get("doi"),
+            w.get("display_name") or w.get("title"),
+            w.get("publication_year"),
+            w.get("type"),
+            w.get("cited_by_count"),
+            _get(w, "open_access", "oa_status"),
+            _get(w, "primary_location", "source", "display_name"),
+            short_id(topic.get("id")) or None,
+            topic.get("display_name"),
+            _get(topic, "field", "display_name"),
+            _get(topic, "subfield", "display_name"),
+            w.get("fwci"),
+            now,
+        ))
+
+        seen_authors = set()
+        for pos, a in enumerate(w.get("authorships") or []):
+            aid = short_id(_get(a, "author", "id"))
+            if not aid or aid in seen_authors:
+                continue
+            seen_authors.add(aid)
+            author_rows[aid] = (aid, _get(a, "author", "display_name"), _get(a, "author", "orcid"))
+            authorship_rows.append((wid, aid, a.get("author_position"), pos, int(bool(a.get("is_corresponding")))))
+            for inst in a.get("institutions") or []:
+                iid = short_id(inst.get("id"))
+                if not iid:
+                    continue
+                inst_rows[iid] = (iid, inst.get("display_name"), inst.get("ror"), inst.get("country_code"), inst.get("type"))
+                auth_inst_rows.append((wid, aid, iid))
+
+        for c in w.get("concepts") or []:
+            cid = short_id(c.get("id"))
+            if not cid:
+                continue
+            concept_rows[cid] = (cid, c.get("display_name"), c.get("level"))
+            work_concept_rows.append((wid, cid, c.get("score")))
+
+    if not work_rows:
+        return 0
+
+    ids = [(r[0],) for r in work_rows]
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO works (work_id, doi, title, publication_year, type, cited_by_count, oa_status, source_name,
+                               primary_topic_id, primary_topic, field, subfield, fwci, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (work_id) DO UPDATE SET
+                doi = excluded.doi, title = excluded.title, publication_year = excluded.publication_year,
+                type = excluded.type, cited_by_count = excluded.cited_by_count, oa_status = excluded.oa_status,
+                source_name = excluded.source_name, primary_topic_id = excluded.primary_topic_id,
+                primary_topic = excluded.primary_topic, field = excluded.field, subfield = excluded.subfield,
+                fwci = excluded.fwci, updated_at = excluded.updated_at
+            """,
+            work_rows,
+        )
+        conn.executemany(
+            """
+            INSERT INTO authors (author_id, display_name, orcid) VALUES (?, ?, ?)
+            ON CONFLICT (author_id) DO UPDATE SET
+                display_name = COALESCE(excluded.display_name, display_name),
+                orcid = COALESCE(excluded.orcid, orcid)
+            """,
+            author_rows.values(),
+        )
+        conn.executemany("INSERT OR REPLACE INTO institutions VALUES (?, ?, ?, ?, ?)", inst_rows.values())
+        conn.executemany("INSERT OR REPLACE INTO concepts VALUES (?, ?, ?)", concept_rows.values())
+
+        # Child rows are replaced wholesale per work
+        for table in ("authorships", "authorship_institutions", "work_concepts"):
+            conn.executemany(f"DELETE FROM {table} WHERE work_id = ?", ids)
+        conn.executemany("INSERT OR IGNORE INTO authorships VALUES (?, ?, ?, ?, ?)", authorship_rows)
+        conn.executemany("INSERT OR IGNORE INTO authorship_institutions VALUES (?, ?, ?)", auth_inst_rows)
+        conn.executemany("INSERT OR IGNORE INTO work_concepts VALUES (?, ?, ?)", work_concept_rows)
+    return len(work_rows)
+
+
+# ----------------------------
+# Queries
+# ----------------------------
+
+def query_works(
+    conn: sqlite3.Connection,
+    *,
+    author_id: Optional[str] = None,
+    year: Optional[int] = None,
+    topic: Optional[str] = None,
+) -> List[sqlite3.Row]:
+    """Works filtered by any combination of author (any ID form), publication year and topic.
+    `topic` matches the primary topic ID (T…) or its display name (case-insensitive)."""
+    sql = ["SELECT w.* FROM works w"]
+    where: List[str] = []
+    params: List[Any] = []
+    if author_id:
+        sql.append("JOIN authorships a ON a.work_id = w.work_id")
+        where.append("a.author_id = ?")
+        params.append(short_id(author_id))
+    if year is not None:
+        where.append("w.publication_year = ?")
+        params.append(int(year))
+    if topic:
+        if short_id(topic)[:1] == "T" and short_id(topic)[1:].isdigit():
+            where.append("w.primary_topic_id = ?")
+            params.append(short_id(topic))
+        else:
+            where.append("w.primary_topic = ? COLLATE NOCASE")
+            params.append(topic)
+    if where:
+        sql.append("WHERE " + " AND ".join(where))
+    sql.append("ORDER BY w.publication_year DESC, w.cited_by_count DESC")
+    return conn.execute(" ".join(sql), params).fetchall()
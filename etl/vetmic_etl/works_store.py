@@ -0,0 +1,141 @@
+"""
+Canonical works store and derived reporting-window views.
+
+The harvest downloads every author's lifetime works once and appends them (tagged with the author)
+to a single store CSV. Reporting windows ("views") are then cut from that store locally, so adding
+a window costs no extra API traffic.
+
+View names
+----------
+- "lifetime"          all works in the store
+- "last<N>y"          publication_year >= current_year - N + 1 (e.g. last5y in 2025 -> 2021..2025)
+
+Each view writes two files next to the store (for "lifetime" the store itself is the compiled file):
+    openalex_all_authors_<view>_key_fields.csv        one row per (author, work); used for co-authorship
+    openalex_all_authors_<view>_key_fields_dedup.csv  one row per work (dedup on id + doi)
+and a small works_views.json manifest describes all views (year range, files, row counts) so the
+dashboard can pick its default year range instead of hard-coding it.
+Only the primary (last5y) pair and the manifest are committed by the nightly workflow; the store
+and the other views are rebuilt each run and gitignored, for local and ad hoc use.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Optional
+
+from vetmic_etl import frames
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DEFAULT_VIEWS = "lifetime,last3y,last5y,last10y"
+PRIMARY_VIEW = "last5y"
+STORE_FILENAME = "openalex_all_authors_lifetime.csv"
+MANIFEST_FILENAME = "works_views.json"
+DEDUP_SUBSET = ["id", "doi"]
+
+_VIEW_RE = re.compile(r"^last(\d+)y$")
+
+
+def parse_views(spec: str) -> Dict[str, Optional[int]]:
+    """'lifetime,last5y' -> {'lifetime': None, 'last5y': 5}. Raises ValueError on unknown names."""
+    views: Dict[str, Optional[int]] = {}
+    for name in (v.strip() for v in (spec or "").split(",")):
+        if not name:
+            continue
+        if name == "lifetime":
+            views[name] = None
+            continue
+        m = _VIEW_RE.match(name)
+        if not m or int(m.group(1)) < 1:
+            raise ValueError(f"Unknown view {name!r}; use 'lifetime' or 'last<N>y' (e.g. last5y)")
+        views[name] = int(m.group(1))
+    return views
+
+
+def view_paths(out_dir: str, view: str) -> Dict[str, str]:
+    base = os.path.join(out_dir, f"openalex_all_authors_{view}_key_fields")
+    return {"compiled": f"{base}.csv", "dedup": f"{base}_dedup.csv"}
+
+
+def deduplicate(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per work; the first author row wins (same rule as the original dedup step)."""
+    return df.drop_duplicates(subset=DEDUP_SUBSET, keep="first")
+
+
+def materialize_views(
+    store_path: str,
+    out_dir: str,
+    views: Dict[str, Optional[int]],
+    *,
+    current_year: Optional[int] = None,
+    dedup_overrides: Optional[Dict[str, str]] = None,
+    store: Optional[pd.DataFrame] = None,
+) -> Dict[str, Dict[str, object]]:
+    """Read the store once and write compiled + dedup CSVs for every view, plus the manifest.
+
+    dedup_overrides maps a view name to an explicit dedup path (the CLI's --output for last5y).
+    `store` is the already-parsed store (frames.read_compact_csv(store_path)), so a caller that
+    also builds the co-author graph parses the CSV only once. Returns the manifest's "views" mapping.
+    """
+    import pandas as pd  # not at module level, see vetmic_etl/frames.py
+
+    current_year = current_year or datetime.now().year
+    dedup_overrides = dedup_overrides or {}
+
+    if store is None:
+        store = frames.read_compact_csv(store_path)
+    if "publication_year" in store.columns:
+        years = pd.to_numeric(store["publication_year"], errors="coerce")
+    else:
+        logging.warning("publication_year missing in works store; windowed views will be empty")
+        years = pd.Series(float("nan"), index=store.index)
+    first_year = int(years.min()) if years.notna().any() else None
+    logging.info("Works store %s: %d author-work rows", store_path, len(store))
+
+    summary: Dict[str, Dict[str, object]] = {}
+    for view, years_back in views.items():
+        paths = view_paths(out_dir, view)
+        if view in dedup_overrides:
+            paths["dedup"] = dedup_overrides[view]
+
+        if years_back is None:
+            # The store already is the lifetime authorship table; don't write a second copy
+            start_year = first_year
+            subset = store
+            paths["compiled"] = store_path
+        else:
+            start_year = current_year - years_back + 1
+            subset = store[(years >= start_year).fillna(False)]
+
+        dedup = deduplicate(subset)
+        for path, frame in ((paths["compiled"], subset), (paths["dedup"], dedup)):
+            if path == store_path:
+                continue
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            frame.to_csv(path, index=False)
+        logging.info(f"View {view}: {len(subset)} rows -> {len(dedup)} unique works ({start_year}..{current_year})")
+
+        summary[view] = {
+            "start_year": start_year,
+            "end_year": current_year,
+            "compiled": os.path.relpath(paths["compiled"], out_dir),
+            "dedup": os.path.relpath(paths["dedup"], out_dir),
+            "rows": int(len(subset)),
+            "works": int(len(dedup)),
+        }
+
+    manifest = {
+        "generated": datetime.now().isoformat(timespec="seconds"),
+        "store": os.path.relpath(store_path, out_dir),
+        "primary": PRIMARY_VIEW if PRIMARY_VIEW in summary else next(iter(summary), None),
+        "views": summary,
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    return summary
@@ -0,0 +1,6 @@
+"""Put etl/ on sys.path, as running `python etl/<script>.py` does, so tests import vetmic_etl directly."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "etl"))
@@ -0,0 +1,44 @@
+"""coauthor_graph.betweenness: the batched sparse BFS against networkx's reference Brandes."""
+
+import numpy as np
+import pytest
+
+from vetmic_etl import coauthor_graph
+
+nx = pytest.importorskip("networkx")
+sparse = pytest.importorskip("scipy.sparse")
+
+
+def reference(g):
+    bc = nx.betweenness_centrality(g, normalized=True)
+    return np.array([bc[v] for v in range(g.number_of_nodes())])
+
+
+def adjacency(g, weight=1):
+    # joint-pub counts as weights: betweenness must ignore them
+    return sparse.csr_matrix(nx.to_scipy_sparse_array(g, format="csr", dtype=float) * weight)
+
+
+@pytest.mark.parametrize("g", [
+    nx.path_graph(12),
+    nx.star_graph(9),
+    nx.cycle_graph(11),
+    nx.barbell_graph(6, 3),
+    nx.gnp_random_graph(80, 0.06, seed=3),
+    nx.gnp_random_graph(150, 0.01, seed=5),  # several components
+], ids=["path", "star", "cycle", "barbell", "random", "disconnected"])
+def test_matches_networkx(g):
+    assert np.allclose(coauthor_graph.betweenness(adjacency(g, weight=3)), reference(g), rtol=0, atol=1e-12)
+
+
+def test_source_blocks_do_not_change_result(monkeypatch):
+    g = nx.gnp_random_graph(60, 0.08, seed=7)
+    whole = coauthor_graph.betweenness(adjacency(g))
+    monkeypatch.setattr(coauthor_graph, "BETWEENNESS_BLOCK_ELEMENTS", 60 * 7)  # blocks of 7 sources
+    assert np.allclose(coauthor_graph.betweenness(adjacency(g)), whole, rtol=0, atol=1e-15)
+    assert np.allclose(whole, reference(g), rtol=0, atol=1e-12)
+
+
+def test_tiny_graphs_are_zero():
+    assert coauthor_graph.betweenness(adjacency(nx.path_graph(2))).tolist() == [0.0, 0.0]
+    assert coauthor_graph.betweenness(adjacency(nx.empty_graph(1))).tolist() == [0.0]
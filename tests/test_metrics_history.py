@@ -0,0 +1,80 @@
+"""metrics_history: snapshots, deltas_since / growth baselines, and the JSON export round trip."""
+
+from datetime import date
+
+import pytest
+
+from vetmic_etl import metrics_history as mh
+
+
+def row(aid, h, works=None, cites=None, name=None):
+    return {"OpenAlexID": f"https://openalex.org/{aid}", "Display_name": name or aid, "ORCID": None,
+            "H_index": h, "I10_index": h, "Works_count": works if works is not None else 10 * h,
+            "Total_citations": cites if cites is not None else 100 * h}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    c = mh.open_history(str(tmp_path / "history.sqlite"))
+    mh.record_snapshot(c, [row("A1", 2), row("A2", 0, works=5, cites=0)], run_date="2025-01-01")
+    mh.record_snapshot(c, [row("A1", 3), row("A2", 1, works=6, cites=4)], run_date="2025-03-01")
+    mh.record_snapshot(c, [row("A1", 5), row("A2", 1, works=6, cites=4), row("A3", 7)], run_date="2025-06-01")
+    yield c
+    c.close()
+
+
+def by_author(rows):
+    return {r["author_id"]: r for r in rows}
+
+
+def test_record_snapshot_skips_rows_without_id_or_metrics(conn):
+    n = mh.record_snapshot(conn, [
+        {"OpenAlexID": "", "H_index": 1},
+        {"OpenAlexID": "A9", "H_index": None, "Works_count": float("nan")},
+        row("A1", 6),
+    ], run_date="2025-06-01")
+    assert n == 1
+    # Same-day rerun replaces that day's snapshot instead of adding one
+    assert tuple(conn.execute("SELECT COUNT(*), MAX(h_index) FROM metrics_history WHERE author_id = 'A1' AND run_date = '2025-06-01'").fetchone()) == (1, 6)
+
+
+def test_deltas_since_uses_last_snapshot_on_or_before(conn):
+    rows = by_author(mh.deltas_since(conn, "2025-02-15"))
+    assert (rows["A1"]["from_date"], rows["A1"]["to_date"]) == ("2025-01-01", "2025-06-01")
+    assert rows["A1"]["H_index"] == 5 and rows["A1"]["H_index_delta"] == 3
+    assert rows["A1"]["Total_citations_delta"] == 300
+    # First seen after `since`: baseline is the earliest snapshot, so no change yet
+    assert rows["A3"]["from_date"] == rows["A3"]["to_date"] == "2025-06-01"
+    assert rows["A3"]["H_index_delta"] == 0
+
+    rows = by_author(mh.deltas_since(conn, "2025-03-01"))  # the boundary date itself is the baseline
+    assert rows["A1"]["from_date"] == "2025-03-01" and rows["A1"]["H_index_delta"] == 2
+
+
+def test_growth_pct_and_zero_baseline(conn):
+    rows = by_author(mh.growth(conn, 5, as_of=date(2025, 6, 15)))  # since 2025-01-15
+    assert rows["A1"]["H_index_growth_pct"] == 150.0
+    assert rows["A2"]["Works_count_growth_pct"] == 20.0
+    assert rows["A2"]["H_index_growth_pct"] is None  # baseline 0
+    assert rows["A2"]["Total_citations_growth_pct"] is None
+
+
+def test_months_ago_clamps_day():
+    assert mh.months_ago(date(2025, 3, 31), 1) == date(2025, 2, 28)
+    assert mh.months_ago(date(2024, 3, 31), 1) == date(2024, 2, 29)
+    assert mh.months_ago(date(2025, 1, 15), 13) == date(2023, 12, 15)
+
+
+def test_export_import_round_trip_keeps_change_points(conn, tmp_path):
+    path = str(tmp_path / "history.json")
+    mh.export_history_json(conn, path)
+
+    seeded = mh.open_history(str(tmp_path / "seeded.sqlite"))
+    try:
+        # A2 is unchanged on 2025-06-01, so that snapshot is not a change point
+        assert mh.import_history_json(seeded, path) == 6
+        # Same baselines and values; an unchanged author's to_date is its last change point
+        strip = lambda rows: [{k: v for k, v in r.items() if k != "to_date"} for r in rows]
+        assert strip(mh.deltas_since(seeded, "2025-02-15")) == strip(mh.deltas_since(conn, "2025-02-15"))
+    finally:
+        seeded.close()
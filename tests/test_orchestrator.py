@@ -0,0 +1,200 @@
+"""run_etl against a stubbed OpenAlex client: roster-order store, failure paths, and equivalence with
+the sequential fetch_metrics + harvest path."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from vetmic_etl import bundle, metrics, works
+from vetmic_etl.orchestrator import run_etl
+
+YEAR = datetime.now().year
+ROSTER = [
+    # Name, OpenAlexID, ORCID
+    ("Ada Slow", "A1", ""),
+    ("Ben Fast", "A2", ""),
+    ("Cy Orcid", "", "0000-0002-1825-0097"),
+    ("Di Fast", "A4", ""),
+]
+ORCID_AUTHOR = "A3"
+
+
+class Response:
+    def __init__(self, payload, status_code=200):
+        self._payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+class StubClient:
+    """Call-compatible with OpenAlexClient.get. Author lookups and works crawls are served from
+    deterministic fixtures; `fail_lookup` / `fail_crawl` make those calls raise, and `slow` delays
+    an author's crawl so crawls finish out of roster order."""
+
+    def __init__(self, fail_lookup=(), fail_crawl=(), slow=(), no_recent=()):
+        self.fail_lookup, self.fail_crawl, self.slow, self.no_recent = set(fail_lookup), set(fail_crawl), set(slow), set(no_recent)
+        self.stats = {"requests": 0, "cache_hits": 0, "throttled": 0}
+        self.headers = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self._lock:
+            self.stats["requests"] += 1
+        if "/authors/" in url:
+            key = url.rsplit("/", 1)[-1]
+            aid = ORCID_AUTHOR if key.startswith("orcid:") else key
+            if aid in self.fail_lookup:
+                raise RuntimeError(f"lookup failed for {aid}")
+            return Response(self.author(aid))
+        aid = params["filter"].rsplit("/", 1)[-1]
+        if aid in self.fail_crawl:
+            raise RuntimeError(f"crawl failed for {aid}")
+        if aid in self.slow:
+            time.sleep(0.3)
+        return Response({"results": self.works(aid), "meta": {"next_cursor": None}})
+
+    @staticmethod
+    def author(aid):
+        n = int(aid[1:])
+        return {
+            "id": f"https://openalex.org/{aid}",
+            "display_name": f"Author {aid}",
+            "orcid": f"https://orcid.org/0000-0002-1825-00{n:02d}",
+            "works_count": 10 * n,
+            "cited_by_count": 100 * n,
+            "summary_stats": {"h_index": n, "i10_index": n - 1},
+        }
+
+    def works(self, aid):
+        n = int(aid[1:])
+        out = []
+        for i in range(3):
+            # W100 is shared by every author (co-authorship); the rest are the author's own
+            wid = "W100" if i == 0 else f"W{n}{i}"
+            year = YEAR - 20 if aid in self.no_recent else YEAR - i
+            out.append({
+                "id": f"https://openalex.org/{wid}",
+                "doi": f"https://doi.org/10.1/{wid}",
+                "display_name": f"Work {wid}",
+                "publication_year": year,
+                "type": "article",
+                "cited_by_count": i,
+                "open_access": {"oa_status": "gold"},
+                "primary_topic": {"id": "https://openalex.org/T1", "display_name": "Phage",
+                                  "field": {"display_name": "F"}, "subfield": {"display_name": "S"}},
+                "authorships": [{"author_position": "first",
+                                 "author": {"id": f"https://openalex.org/{aid}", "display_name": f"Author {aid}"},
+                                 "institutions": [{"id": "https://openalex.org/I1", "display_name": "U"}]}],
+                "concepts": [{"id": "https://openalex.org/C1", "display_name": "Bio", "level": 0, "score": 0.4}],
+            })
+        return out
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def roster(tmp_path):
+    path = tmp_path / "roster.csv"
+    pd.DataFrame(ROSTER, columns=["Name", "OpenAlexID", "ORCID"]).to_csv(path, index=False)
+    return str(path)
+
+
+def run(roster, out_dir, client, **kwargs):
+    kwargs.setdefault("publish", False)
+    return run_etl(
+        roster,
+        os.path.join(out_dir, "roster_with_metrics.csv"),
+        os.path.join(out_dir, "openalex_all_authors_last5y_key_fields_dedup.csv"),
+        client=client, workers=3, **kwargs,
+    )
+
+
+def store_authors(out_dir):
+    store = pd.read_csv(os.path.join(out_dir, "openalex_all_authors_lifetime.csv"))
+    return list(dict.fromkeys(store["author_openalex_id"]))
+
+
+def test_store_is_written_in_roster_order(roster, tmp_path):
+    out = str(tmp_path / "out")
+    result = run(roster, out, StubClient(slow={"A1"}))
+
+    assert store_authors(out) == [f"https://openalex.org/A{n}" for n in (1, 2, 3, 4)]
+    assert result["works"]["processed"] == 4
+    merged = pd.read_csv(os.path.join(out, "roster_with_metrics.csv"))
+    assert list(merged["Name"]) == [name for name, _, _ in ROSTER]
+    # The ORCID-only row is resolved through the lookup and then crawled
+    assert merged.loc[2, "OpenAlexID"] == f"https://openalex.org/{ORCID_AUTHOR}"
+    assert merged.loc[2, "H_index"] == 3
+
+
+def test_matches_sequential_scripts(roster, tmp_path):
+    seq, conc = str(tmp_path / "seq"), str(tmp_path / "conc")
+    os.makedirs(seq)
+    metrics_out = os.path.join(seq, "roster_with_metrics.csv")
+    metrics.fetch_metrics(roster, metrics_out, session=StubClient(), delay=0)
+    works.harvest(metrics_out, os.path.join(seq, "openalex_all_authors_last5y_key_fields_dedup.csv"), session=StubClient())
+    run(roster, conc, StubClient(slow={"A1", "A2"}))
+
+    csvs = sorted(f for f in os.listdir(seq) if f.endswith(".csv"))
+    assert csvs == sorted(f for f in os.listdir(conc) if f.endswith(".csv"))
+    for name in csvs:
+        with open(os.path.join(seq, name), "rb") as a, open(os.path.join(conc, name), "rb") as b:
+            assert a.read() == b.read(), name
+    views = [json.load(open(os.path.join(d, "works_views.json"))) for d in (seq, conc)]
+    assert views[0]["views"] == views[1]["views"]
+
+
+def test_lookup_failure_keeps_row_and_still_crawls(roster, tmp_path):
+    out = str(tmp_path / "out")
+    result = run(roster, out, StubClient(fail_lookup={"A2"}))
+
+    merged = pd.read_csv(os.path.join(out, "roster_with_metrics.csv"))
+    assert merged.loc[1, "OpenAlexID"] == "A2"  # identifiers kept, metrics empty
+    assert merged.loc[1, ["H_index", "Works_count"]].isna().all()
+    assert "https://openalex.org/A2" in store_authors(out)  # crawled with the roster's own ID
+    assert result["works"]["processed"] == 4
+
+
+def test_crawl_failure_skips_only_that_author(roster, tmp_path):
+    out = str(tmp_path / "out")
+    result = run(roster, out, StubClient(fail_crawl={"A2"}, slow={"A1"}))
+
+    assert store_authors(out) == [f"https://openalex.org/A{n}" for n in (1, 3, 4)]
+    assert result["works"]["processed"] == 3
+
+
+def test_no_recent_works_raises_after_writing_metrics(roster, tmp_path):
+    out = str(tmp_path / "out")
+    with pytest.raises(works.HarvestError):
+        run(roster, out, StubClient(no_recent={"A1", "A2", "A3", "A4"}))
+
+    merged = pd.read_csv(os.path.join(out, "roster_with_metrics.csv"))
+    assert list(merged["H_index"]) == [1, 2, 3, 4]
+
+
+def test_bundle_republished_when_harvest_fails(roster, tmp_path):
+    out = str(tmp_path / "out")
+    run(roster, out, StubClient(), publish=True)
+    with pytest.raises(works.HarvestError):
+        run(roster, out, StubClient(no_recent={"A1", "A2", "A3", "A4"}, fail_lookup={"A2"}), publish=True)
+
+    # The manifest points at the rewritten roster, not the copy from the first run
+    with open(os.path.join(out, bundle.BUNDLE_DIRNAME, bundle.MANIFEST_FILENAME), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for key in ("roster", "metrics_history", "pubs"):
+        with open(os.path.join(out, manifest["artifacts"][key]["source"]), "rb") as f:
+            assert manifest["artifacts"][key]["hash"] == hashlib.sha256(f.read()).hexdigest()[:bundle.HASH_LENGTH]
+    assert set(manifest["artifacts"]["roster"]["encodings"]) == {"gzip"}
@@ -0,0 +1,75 @@
+"""runlog.prune_logs: the retention rules for the committed logs/ directory."""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+from vetmic_etl import runlog
+
+
+def stamp(days_ago):
+    return (datetime.now() - timedelta(days=days_ago)).strftime("%Y%m%d_%H%M%S")
+
+
+def write(log_dir, name, size):
+    path = log_dir / name
+    path.write_bytes(b"x" * size)
+    return name
+
+
+def remaining(log_dir):
+    return sorted(os.listdir(log_dir))
+
+
+def test_empty_files_are_removed(tmp_path):
+    keep = write(tmp_path, f"etl_run_{stamp(1)}.jsonl", 10)
+    empty = write(tmp_path, f"etl_run_{stamp(1)}.detail.log.gz", 0)
+    removed = runlog.prune_logs(str(tmp_path), retention_days=30, max_total_bytes=0)
+    assert [os.path.basename(p) for p in removed] == [empty]
+    assert remaining(tmp_path) == [keep]
+
+
+def test_age_comes_from_the_filename_stamp(tmp_path):
+    old = write(tmp_path, f"etl_run_{stamp(40)}.jsonl", 10)
+    new = write(tmp_path, f"etl_run_{stamp(5)}.jsonl", 10)
+    # mtime says the old run is brand new, the recent one ancient: the name wins
+    now = time.time()
+    os.utime(tmp_path / old, (now, now))
+    os.utime(tmp_path / new, (now - 90 * 86400, now - 90 * 86400))
+    runlog.prune_logs(str(tmp_path), retention_days=30, max_total_bytes=0)
+    assert remaining(tmp_path) == [new]
+
+
+def test_unstamped_names_fall_back_to_mtime(tmp_path):
+    old = write(tmp_path, "notes.log", 10)
+    new = write(tmp_path, "scratch.log", 10)
+    then = time.time() - 60 * 86400
+    os.utime(tmp_path / old, (then, then))
+    runlog.prune_logs(str(tmp_path), retention_days=30, max_total_bytes=0)
+    assert remaining(tmp_path) == [new]
+
+
+def test_size_cap_drops_oldest_runs_first(tmp_path):
+    names = [write(tmp_path, f"etl_run_{stamp(d)}.jsonl", 100) for d in (1, 2, 3, 4)]
+    removed = runlog.prune_logs(str(tmp_path), retention_days=0, max_total_bytes=250)
+    assert sorted(os.path.basename(p) for p in removed) == sorted(names[2:])
+    assert remaining(tmp_path) == sorted(names[:2])
+
+
+def test_legacy_logs_follow_the_same_rules(tmp_path):
+    expired = write(tmp_path, f"etl_run_{stamp(45)}.log", 10)
+    empty = write(tmp_path, f"etl_run_{stamp(1)}.log", 0)
+    recent = write(tmp_path, f"etl_run_{stamp(2)}.log", 100)
+    newest = write(tmp_path, f"etl_run_{stamp(0)}.jsonl", 100)
+    oldest_in_window = write(tmp_path, f"etl_run_{stamp(3)}.log", 100)
+    runlog.prune_logs(str(tmp_path), retention_days=30, max_total_bytes=200)
+    assert remaining(tmp_path) == sorted([recent, newest])
+    assert {expired, empty, oldest_in_window}.isdisjoint(remaining(tmp_path))
+
+
+def test_other_files_and_missing_dir_are_left_alone(tmp_path):
+    write(tmp_path, "README.md", 0)
+    write(tmp_path, f"metrics_{stamp(90)}.csv", 10)
+    assert runlog.prune_logs(str(tmp_path), retention_days=1, max_total_bytes=1) == []
+    assert len(remaining(tmp_path)) == 2
+    assert runlog.prune_logs(str(tmp_path / "missing")) == []
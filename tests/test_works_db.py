@@ -0,0 +1,103 @@
+"""works_db: ID normalisation, upsert replacing a work's child rows, and query_works filters."""
+
+import pytest
+
+from vetmic_etl import works_db
+
+
+def work(wid, year, topic_id, topic, authors, concepts=(), cites=0):
+    """Raw OpenAlex /works object; authors are (author_id, [institution_id, ...]) pairs."""
+    return {
+        "id": f"https://openalex.org/{wid}",
+        "doi": f"https://doi.org/10.1/{wid.lower()}",
+        "display_name": f"Work {wid}",
+        "publication_year": year,
+        "type": "article",
+        "cited_by_count": cites,
+        "primary_topic": {"id": f"https://openalex.org/{topic_id}", "display_name": topic,
+                          "field": {"display_name": "Field"}, "subfield": {"display_name": "Subfield"}},
+        "authorships": [
+            {"author": {"id": f"https://openalex.org/{aid}", "display_name": f"Author {aid}"},
+             "author_position": "first" if i == 0 else "middle",
+             "institutions": [{"id": f"https://openalex.org/{iid}", "display_name": f"Inst {iid}"} for iid in insts]}
+            for i, (aid, insts) in enumerate(authors)
+        ],
+        "concepts": [{"id": f"https://openalex.org/{cid}", "display_name": f"Concept {cid}", "level": 1, "score": 0.5}
+                     for cid in concepts],
+    }
+
+
+@pytest.fixture
+def conn(tmp_path):
+    c = works_db.open_works_db(str(tmp_path / "works.sqlite"))
+    works_db.upsert_works(c, [
+        work("W1", 2023, "T10", "Antimicrobial Resistance", [("A1", ["I1"]), ("A2", ["I2"])], ["C1"], cites=5),
+        work("W2", 2023, "T20", "Bovine Mastitis", [("A1", ["I1"])], cites=9),
+        work("W3", 2022, "T10", "Antimicrobial Resistance", [("A2", ["I2"]), ("A3", [])]),
+    ])
+    yield c
+    c.close()
+
+
+def ids(rows):
+    return [r["work_id"] for r in rows]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("https://openalex.org/W123", "W123"),
+    ("https://api.openalex.org/authors/A123", "A123"),
+    ("https://openalex.org/A123/", "A123"),
+    ("openalex:a123", "A123"),
+    ("OpenAlex:T55", "T55"),
+    ("  W9  ", "W9"),
+    ("i77", "I77"),
+    (None, ""),
+    (float("nan"), ""),
+    ("None", ""),
+    ("", ""),
+])
+def test_short_id(value, expected):
+    assert works_db.short_id(value) == expected
+
+
+def test_upsert_replaces_child_rows(conn):
+    # OpenAlex corrected W1: A2 dropped, A4 added, A1 moved institution, concept C1 -> C2
+    n = works_db.upsert_works(conn, [
+        work("W1", 2023, "T10", "Antimicrobial Resistance", [("A1", ["I3"]), ("A4", [])], ["C2"], cites=8),
+    ])
+    assert n == 1
+    assert conn.execute("SELECT COUNT(*) FROM works").fetchone()[0] == 3
+    assert conn.execute("SELECT cited_by_count FROM works WHERE work_id = 'W1'").fetchone()[0] == 8
+    authors = conn.execute("SELECT author_id, position_index FROM authorships WHERE work_id = 'W1' ORDER BY author_id")
+    assert [tuple(r) for r in authors] == [("A1", 0), ("A4", 1)]
+    insts = conn.execute("SELECT author_id, institution_id FROM authorship_institutions WHERE work_id = 'W1'")
+    assert [tuple(r) for r in insts] == [("A1", "I3")]
+    assert [r[0] for r in conn.execute("SELECT concept_id FROM work_concepts WHERE work_id = 'W1'")] == ["C2"]
+    # Other works' child rows are untouched
+    assert ids(works_db.query_works(conn, author_id="A2")) == ["W3"]
+
+
+def test_upsert_skips_works_without_id_and_duplicate_authors(conn):
+    dup = work("W4", 2024, "T10", "Antimicrobial Resistance", [("A1", ["I1"]), ("A1", ["I2"])])
+    assert works_db.upsert_works(conn, [{"id": None}, dup]) == 1
+    rows = conn.execute("SELECT author_id, institution_id FROM authorship_institutions WHERE work_id = 'W4'")
+    assert [tuple(r) for r in rows] == [("A1", "I1")]
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({}, ["W2", "W1", "W3"]),  # newest first, then most cited
+    ({"author_id": "A1"}, ["W2", "W1"]),
+    ({"author_id": "https://openalex.org/A2"}, ["W1", "W3"]),
+    ({"year": 2022}, ["W3"]),
+    ({"topic": "T10"}, ["W1", "W3"]),
+    ({"topic": "https://openalex.org/T20"}, ["W2"]),
+    ({"topic": "antimicrobial RESISTANCE"}, ["W1", "W3"]),
+    ({"author_id": "A1", "year": 2023}, ["W2", "W1"]),
+    ({"author_id": "A2", "topic": "T10"}, ["W1", "W3"]),
+    ({"year": 2023, "topic": "bovine mastitis"}, ["W2"]),
+    ({"author_id": "A2", "year": 2022, "topic": "T10"}, ["W3"]),
+    ({"author_id": "A3", "year": 2023}, []),
+    ({"topic": "T99"}, []),
+])
+def test_query_works(conn, filters, expected):
+    assert ids(works_db.query_works(conn, **filters)) == expected